@@ -2,33 +2,30 @@
 FastAPI backend for DocumentAI Processing System UI
 Provides REST API endpoints for the web interface
 """
-from fastapi import FastAPI, HTTPException, UploadFile, File, Query, Depends
-from fastapi.responses import StreamingResponse, FileResponse
+from fastapi import FastAPI, HTTPException, UploadFile, File, Query, Request
+from fastapi.responses import StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.middleware.gzip import GZipMiddleware
 from typing import List, Optional, Dict, Any
 import logging
 import os
 import sys
-import io
-from datetime import datetime, date
+import time
+import hashlib
+from collections import OrderedDict
+from datetime import datetime
+from uuid import uuid4
 from pydantic import BaseModel
 import asyncio
-import psycopg2
-from src.database_service import DatabaseService
-from src.gcs_file_manager import GCSFileManager
-import config.config as config
-from concurrent.futures import ThreadPoolExecutor
-from google.cloud import storage
-import tempfile
-import subprocess
+import asyncpg
+import orjson
+from google.api_core.exceptions import NotFound
 
 # Add current directory to path
 sys.path.insert(0, os.path.dirname(__file__))
 
-from src.database_service import DatabaseService
-from src.gcs_file_manager import GCSFileManager
 from src.invoice_processor import InvoiceProcessor
-from config.config import BUCKET_NAME, INPUT_FOLDER, PROCESSED_FOLDER
+from config.config import DB_CONFIG
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -41,6 +38,19 @@ app = FastAPI(
     version="1.0.0",
 )
 
+class APIGZipMiddleware(GZipMiddleware):
+    """Gzip JSON responses but pass PDF streams (already compressed) through untouched"""
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].endswith("/pdf"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+# Compress list responses; their repeated field names shrink to a fraction on the wire
+app.add_middleware(APIGZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -48,25 +58,276 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor-Created-At", "X-Next-Cursor-Id"],
 )
 
-def get_db_connection():
-    """Get database connection"""
-    return psycopg2.connect(
-        host=config.DATABASE_HOST,
-        database=config.DATABASE_NAME,
-        user=config.DATABASE_USER,
-        password=config.DATABASE_PASSWORD,
-        port=config.DATABASE_PORT
+# Hot read queries. The SQL text is constant (optional filters use
+# "$n IS NULL OR ..."), so asyncpg's per-connection statement cache reuses
+# the prepared statement and Postgres only receives bind parameters.
+STATEMENT_CACHE_SIZE = 256
+
+# List queries page by keyset on (created_at, id) when a cursor is given, so
+# deep pages are an index range scan instead of an OFFSET walk. Without a
+# cursor id the (cursor, 0) bound selects rows strictly older than the cursor.
+# Each entity column is a LATERAL lookup of the most confident value, so a
+# document yields exactly one row without a DISTINCT over the projection.
+# Substring filters are semi-joins on extracted_entities so Postgres can
+# answer them once from the pg_trgm indexes instead of per document.
+# Columns are cast to the model field types because rows are built with
+# model_construct (no per-row validation).
+Q_DOCS_TABLE = """
+    SELECT 
+        dp.id,
+        dp.file_name,
+        dp.document_status,
+        dp.min_confidence::float8 as min_confidence,
+        dp.processing_status,
+        dp.exception_reason_code,
+        dp.created_at as date_received,
+        invoice_type.entity_value as invoice_type
+    FROM document_processing dp
+    LEFT JOIN LATERAL (
+        SELECT entity_value FROM extracted_entities
+        WHERE processing_id = dp.id AND entity_name = 'invoice_type'
+        ORDER BY confidence_score DESC LIMIT 1
+    ) invoice_type ON true
+    WHERE ($1::text IS NULL OR dp.document_status = $1)
+      AND ($4::timestamp IS NULL OR (dp.created_at, dp.id) < ($4, COALESCE($5::int, 0)))
+    ORDER BY dp.created_at DESC, dp.id DESC
+    LIMIT $2 OFFSET $3
+"""
+
+Q_DOCS_LIST = """
+    SELECT
+        dp.id,
+        dp.file_name,
+        dp.processing_status,
+        dp.document_status,
+        dp.min_confidence::float8 as min_confidence,
+        dp.exception_reason_code,
+        dp.exception_reason_description,
+        dp.created_at,
+        dp.updated_at,
+        dp.error_message,
+        po.entity_value as po_number,
+        supplier.entity_value as supplier_name,
+        inv_date.entity_value as invoice_date,
+        inv_type.entity_value as invoice_type
+    FROM document_processing dp
+    LEFT JOIN LATERAL (
+        SELECT entity_value FROM extracted_entities
+        WHERE processing_id = dp.id AND entity_name = 'po_number'
+        ORDER BY confidence_score DESC LIMIT 1
+    ) po ON true
+    LEFT JOIN LATERAL (
+        SELECT entity_value FROM extracted_entities
+        WHERE processing_id = dp.id AND entity_name = 'vendor_name'
+        ORDER BY confidence_score DESC LIMIT 1
+    ) supplier ON true
+    LEFT JOIN LATERAL (
+        SELECT entity_value FROM extracted_entities
+        WHERE processing_id = dp.id AND entity_name = 'invoice_date'
+        ORDER BY confidence_score DESC LIMIT 1
+    ) inv_date ON true
+    LEFT JOIN LATERAL (
+        SELECT entity_value FROM extracted_entities
+        WHERE processing_id = dp.id AND entity_name = 'invoice_type'
+        ORDER BY confidence_score DESC LIMIT 1
+    ) inv_type ON true
+    WHERE ($1::text IS NULL OR dp.file_name ILIKE $1)
+      AND ($2::text IS NULL OR dp.id IN (
+          SELECT processing_id FROM extracted_entities
+          WHERE entity_name = 'po_number' AND entity_value ILIKE $2))
+      AND ($3::text IS NULL OR dp.id IN (
+          SELECT processing_id FROM extracted_entities
+          WHERE entity_name = 'vendor_name' AND entity_value ILIKE $3))
+      AND ($4::text IS NULL OR dp.document_status = $4)
+      AND ($7::timestamp IS NULL OR (dp.created_at, dp.id) < ($7, COALESCE($8::int, 0)))
+    ORDER BY dp.created_at DESC, dp.id DESC
+    LIMIT $5 OFFSET $6
+"""
+
+# Document row plus its entities as one JSON array, in a single round trip
+Q_DOC_DETAIL = """
+    SELECT dp.id, dp.file_name, dp.gcs_path, dp.processing_status, 
+           dp.document_status, dp.min_confidence, dp.exception_reason_code, 
+           dp.exception_reason_description, dp.exception_entities, 
+           dp.created_at, dp.updated_at, dp.error_message,
+           COALESCE(
+               json_agg(
+                   json_build_object(
+                       'entity_name', e.entity_name,
+                       'entity_value', e.entity_value,
+                       'confidence', e.confidence_score,
+                       'page_number', e.page_number
+                   )
+                   ORDER BY e.entity_name, e.confidence_score DESC
+               ) FILTER (WHERE e.id IS NOT NULL),
+               '[]'
+           ) AS entities
+    FROM document_processing dp
+    LEFT JOIN extracted_entities e ON dp.id = e.processing_id
+    WHERE dp.id = $1
+    GROUP BY dp.id
+"""
+
+# 30-day dashboard figures and 7-day upload count in one pass over the table;
+# the 7-day window lies inside the 30-day range scan, so no second query is needed
+Q_STATS = """
+    SELECT 
+        COUNT(*) as total_documents,
+        COUNT(*) FILTER (WHERE processing_status = 'SUCCESS' AND document_status = 'SUCCESS') as successful,
+        COUNT(*) FILTER (WHERE processing_status = 'FAILED') as processing_failed,
+        COUNT(*) FILTER (WHERE document_status = 'FAILED') as validation_failed,
+        COUNT(*) FILTER (WHERE document_status = 'PENDING_REVIEW') as pending_review,
+        AVG(min_confidence) as avg_min_confidence,
+        COUNT(*) FILTER (WHERE created_at >= NOW() - INTERVAL '7 days') as recent_uploads
+    FROM document_processing
+    WHERE created_at >= NOW() - INTERVAL '30 days'
+"""
+
+
+def _ilike_pattern(value: Optional[str]) -> Optional[str]:
+    """Wrap a filter value for substring ILIKE matching"""
+    return f"%{value}%" if value else None
+
+
+def _set_next_cursor(response: Response, rows, limit: int, created_at_index: int):
+    """Expose the keyset cursor for the next page when this page is full"""
+    if rows and len(rows) == limit:
+        last = rows[-1]
+        response.headers["X-Next-Cursor-Created-At"] = last[created_at_index].isoformat()
+        response.headers["X-Next-Cursor-Id"] = str(last[0])
+
+
+# Maximum number of files uploaded to GCS in parallel per request
+UPLOAD_CONCURRENCY = 8
+
+# Resumable upload chunk size (GCS requires a multiple of 256 KiB)
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Files up to this size go up in a single multipart request; larger (or
+# unknown-size) files use a chunked resumable session
+MULTIPART_UPLOAD_MAX_SIZE = 8 * 1024 * 1024
+
+# Size of each GCS read when streaming PDFs to the client
+PDF_CHUNK_SIZE = 1024 * 1024
+
+# Stored PDFs never change, so browsers may reuse them and revalidate by ETag
+PDF_CACHE_CONTROL = "private, max-age=3600"
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header value against a strong ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+# Dashboard statistics change slowly and are polled; serve them from memory briefly
+STATS_CACHE_TTL_SECONDS = 10
+
+# In-process cache of computed statistics: {key: (expires_at, value)}
+_stats_cache: Dict[str, tuple] = {}
+
+
+def _get_cached_stats(key: str):
+    """Return the cached value for key, or None if missing or expired"""
+    expires_at, value = _stats_cache.get(key, (0, None))
+    return value if expires_at > time.monotonic() else None
+
+
+def _set_cached_stats(key: str, value):
+    """Cache a computed statistics value for STATS_CACHE_TTL_SECONDS"""
+    _stats_cache[key] = (time.monotonic() + STATS_CACHE_TTL_SECONDS, value)
+
+
+def invalidate_stats_cache():
+    """Drop all cached statistics so the next request recomputes them"""
+    _stats_cache.clear()
+
+
+# Most recently viewed raw Document AI payloads: {document_id: (etag, json_text)}
+RAW_OUTPUT_CACHE_SIZE = 256
+_raw_output_cache: "OrderedDict[int, tuple]" = OrderedDict()
+
+
+def _raw_output_etag(document_id: int, updated_at) -> str:
+    """Strong ETag for a document's raw output, derived from its last update"""
+    digest = hashlib.blake2b(f"{document_id}:{updated_at}".encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def _cache_raw_output(document_id: int, etag: str, raw_output: str):
+    """Store a raw payload, evicting the least recently used beyond the cap"""
+    _raw_output_cache[document_id] = (etag, raw_output)
+    _raw_output_cache.move_to_end(document_id)
+    while len(_raw_output_cache) > RAW_OUTPUT_CACHE_SIZE:
+        _raw_output_cache.popitem(last=False)
+
+
+async def _iter_blob_chunks(blob):
+    """Stream a GCS blob in chunks without blocking the event loop"""
+    reader = await asyncio.to_thread(blob.open, "rb", chunk_size=PDF_CHUNK_SIZE)
+    try:
+        while True:
+            chunk = await asyncio.to_thread(reader.read, PDF_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        reader.close()
+
+
+async def _init_connection(conn):
+    """Decode json/jsonb columns with orjson as rows are read"""
+    for type_name in ("json", "jsonb"):
+        await conn.set_type_codec(
+            type_name,
+            encoder=lambda value: orjson.dumps(value).decode(),
+            decoder=orjson.loads,
+            schema="pg_catalog"
+        )
+
+
+@app.on_event("startup")
+async def create_db_pool():
+    """Create the shared asyncpg connection pool used by all handlers"""
+    app.state.pg_pool = await asyncpg.create_pool(
+        **DB_CONFIG,
+        min_size=5,
+        max_size=20,
+        max_inactive_connection_lifetime=600,
+        statement_cache_size=STATEMENT_CACHE_SIZE,
+        init=_init_connection
     )
+    logger.info("Database connection pool created")
+
+
+@app.on_event("shutdown")
+async def close_db_pool():
+    """Close the shared asyncpg connection pool"""
+    await app.state.pg_pool.close()
+    logger.info("Database connection pool closed")
 
-# Initialize services
-db_service = DatabaseService()
-gcs_manager = GCSFileManager()
+# Initialize services (one GCS client/bucket shared by all handlers)
 invoice_processor = InvoiceProcessor()
+gcs_manager = invoice_processor.gcs
 
-# Thread pool for background tasks
-executor = ThreadPoolExecutor(max_workers=4)
+# Background processing runs, keyed by job id; the oldest are dropped beyond the cap.
+# Only one job runs at a time and it is always the newest, so eviction only ever
+# removes finished jobs.
+JOB_HISTORY_SIZE = 100
+jobs: "OrderedDict[str, asyncio.Task]" = OrderedDict()
+
+
+def _track_job(job_id: str, task: asyncio.Task):
+    """Record a job, forgetting the oldest beyond the cap"""
+    jobs[job_id] = task
+    while len(jobs) > JOB_HISTORY_SIZE:
+        jobs.popitem(last=False)
 
 # Pydantic models for API responses
 class DocumentTableRow(BaseModel):
@@ -105,7 +366,9 @@ class DocumentDetail(BaseModel):
     min_confidence: Optional[float] = None
     exception_reason_code: Optional[str] = None
     exception_reason_description: Optional[str] = None
-    exception_entities: Optional[List[Dict[str, Any]]] = None  # Changed to List
+    # The stored exception_entities object as a one-element list ([] when none). Before
+    # the asyncpg move this was always [], as the dict column never parsed as a JSON string.
+    exception_entities: Optional[List[Dict[str, Any]]] = None
     invoice_type: Optional[str] = None
     date_received: datetime
     created_at: datetime
@@ -133,6 +396,14 @@ class ProcessingStats(BaseModel):
     recent_uploads: int
     avg_min_confidence: Optional[float] = None
 
+class ProcessingActivity(BaseModel):
+    status: str
+    count: int
+    last_processed: Optional[datetime] = None
+
+class ProcessingStatusResponse(BaseModel):
+    recent_activity: List[ProcessingActivity]
+
 class UploadResponse(BaseModel):
     success: bool
     message: str
@@ -161,8 +432,8 @@ async def health_check():
     """Health check endpoint"""
     try:
         # Test database connection
-        conn = db_service.get_connection()
-        conn.close()
+        async with app.state.pg_pool.acquire() as conn:
+            await conn.fetchval("SELECT 1")
         
         # Test GCS connection
         gcs_manager.client.list_blobs(gcs_manager.bucket_name, max_results=1)
@@ -180,49 +451,24 @@ async def health_check():
 
 @app.get("/api/documents/table", response_model=List[DocumentTableRow])
 async def get_documents_table(
+    response: Response,
     status: Optional[str] = Query(None, description="Filter by document status"),
     limit: int = Query(100, description="Maximum number of results"),
-    offset: int = Query(0, description="Offset for pagination")
+    offset: int = Query(0, description="Offset for pagination"),
+    cursor_created_at: Optional[datetime] = Query(None, description="Keyset cursor: created_at of the last row seen"),
+    cursor_id: Optional[int] = Query(None, description="Keyset cursor: id of the last row seen")
 ):
     """Get documents formatted for table display"""
     try:
-        conn = db_service.get_connection()
-        cursor = conn.cursor()
-        
-        # Query for table display with required fields
-        query = """
-        SELECT 
-            dp.id,
-            dp.file_name,
-            dp.document_status,
-            dp.min_confidence,
-            dp.processing_status,
-            dp.exception_reason_code,
-            dp.created_at as date_received,
-            invoice_type.entity_value as invoice_type
-        FROM document_processing dp
-        LEFT JOIN extracted_entities invoice_type 
-            ON dp.id = invoice_type.processing_id 
-            AND invoice_type.entity_name = 'invoice_type'
-        WHERE 1=1
-        """
-        
-        params = []
-        
-        # Add filters
-        if status:
-            query += " AND dp.document_status = %s"
-            params.append(status)
-        
-        query += " ORDER BY dp.created_at DESC LIMIT %s OFFSET %s"
-        params.extend([limit, offset])
-        
-        cursor.execute(query, params)
-        results = cursor.fetchall()
-        
-        documents = []
-        for row in results:
-            documents.append(DocumentTableRow(
+        async with app.state.pg_pool.acquire() as conn:
+            results = await conn.fetch(
+                Q_DOCS_TABLE, status or None, limit, offset, cursor_created_at, cursor_id
+            )
+        _set_next_cursor(response, results, limit, created_at_index=6)
+        
+        # Rows come straight from our own schema; skip per-row validation
+        return [
+            DocumentTableRow.model_construct(
                 id=row[0],
                 file_name=row[1],
                 document_status=row[2],
@@ -231,12 +477,9 @@ async def get_documents_table(
                 exception_reason_code=row[5],
                 date_received=row[6],
                 invoice_type=row[7]
-            ))
-        
-        cursor.close()
-        conn.close()
-        
-        return documents
+            )
+            for row in results
+        ]
         
     except Exception as e:
         logger.error(f"Failed to get documents table: {str(e)}")
@@ -246,45 +489,27 @@ async def get_documents_table(
 @app.get("/api/documents/stats", response_model=ProcessingStats)
 async def get_processing_stats():
     """Get enhanced dashboard statistics"""
+    cached = _get_cached_stats("processing_stats")
+    if cached is not None:
+        return cached
+    
     try:
-        conn = db_service.get_connection()
-        cursor = conn.cursor()
-        
-        # Enhanced statistics query
-        cursor.execute("""
-            SELECT 
-                COUNT(*) as total_documents,
-                COUNT(CASE WHEN processing_status = 'SUCCESS' AND document_status = 'SUCCESS' THEN 1 END) as successful,
-                COUNT(CASE WHEN processing_status = 'FAILED' THEN 1 END) as processing_failed,
-                COUNT(CASE WHEN document_status = 'FAILED' THEN 1 END) as validation_failed,
-                COUNT(CASE WHEN document_status = 'PENDING_REVIEW' THEN 1 END) as pending_review,
-                AVG(min_confidence) as avg_min_confidence
-            FROM document_processing
-            WHERE created_at >= NOW() - INTERVAL '30 days'
-        """)
-        
-        stats = cursor.fetchone()
-        
-        # Recent uploads (last 7 days)
-        cursor.execute("""
-            SELECT COUNT(*) FROM document_processing 
-            WHERE created_at >= NOW() - INTERVAL '7 days'
-        """)
-        recent_uploads = cursor.fetchone()[0]
-        
-        cursor.close()
-        conn.close()
-        
-        return ProcessingStats(
+        async with app.state.pg_pool.acquire() as conn:
+            # Enhanced statistics query (includes recent uploads, last 7 days)
+            stats = await conn.fetchrow(Q_STATS)
+        
+        result = ProcessingStats(
             total_documents=stats[0] or 0,
             successful=stats[1] or 0,
             failed=(stats[2] or 0) + (stats[3] or 0),  # Both processing and validation failures
             processing_failed=stats[2] or 0,
             validation_failed=stats[3] or 0,
             pending_review=stats[4] or 0,
-            recent_uploads=recent_uploads,
+            recent_uploads=stats[6] or 0,
             avg_min_confidence=float(stats[5]) if stats[5] else None
         )
+        _set_cached_stats("processing_stats", result)
+        return result
         
     except Exception as e:
         logger.error(f"Failed to get stats: {str(e)}")
@@ -292,26 +517,19 @@ async def get_processing_stats():
 
 
 @app.get("/api/documents/{document_id}/pdf")
-async def get_document_pdf(document_id: int):
+async def get_document_pdf(document_id: int, request: Request):
     """Get PDF file for viewing"""
     try:
-        conn = db_service.get_connection()
-        cursor = conn.cursor()
-        
         # Get document info
-        cursor.execute("""
-            SELECT gcs_path, file_name FROM document_processing WHERE id = %s
-        """, (document_id,))
+        async with app.state.pg_pool.acquire() as conn:
+            result = await conn.fetchrow("""
+                SELECT gcs_path, file_name FROM document_processing WHERE id = $1
+            """, document_id)
         
-        result = cursor.fetchone()
         if not result:
-            cursor.close()
-            conn.close()
             raise HTTPException(status_code=404, detail="Document not found")
         
         gcs_path, file_name = result
-        cursor.close()
-        conn.close()
         
         # Parse GCS path (format: gs://bucket/path/to/file)
         if gcs_path.startswith('gs://'):
@@ -320,25 +538,34 @@ async def get_document_pdf(document_id: int):
             blob_path = path_parts[1] if len(path_parts) > 1 else ''
         else:
             # If gcs_path is just the blob path, use the default bucket
-            bucket_name = config.GCS_BUCKET
+            bucket_name = gcs_manager.bucket_name
             blob_path = gcs_path
         
-        # Create storage client and get blob
-        from google.cloud import storage
-        client = storage.Client()
-        bucket = client.bucket(bucket_name)
+        # Reuse the shared storage client instead of re-authenticating per request
+        if bucket_name == gcs_manager.bucket_name:
+            bucket = gcs_manager.bucket
+        else:
+            bucket = gcs_manager.client.bucket(bucket_name)
         blob = bucket.blob(blob_path)
         
-        if not blob.exists():
+        # One metadata request both checks existence and yields the ETag
+        try:
+            await asyncio.to_thread(blob.reload)
+        except NotFound:
             raise HTTPException(status_code=404, detail="PDF file not found in storage")
         
-        # Stream the PDF
-        pdf_content = blob.download_as_bytes()
+        etag = f'"{blob.etag or blob.md5_hash}"'
+        cache_headers = {"ETag": etag, "Cache-Control": PDF_CACHE_CONTROL}
         
+        # Client already has this version; skip the download entirely
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=cache_headers)
+        
+        # Stream the PDF chunk by chunk instead of buffering it in memory
         return StreamingResponse(
-            io.BytesIO(pdf_content),
+            _iter_blob_chunks(blob),
             media_type="application/pdf",
-            headers={"Content-Disposition": f"inline; filename={file_name}"}
+            headers={"Content-Disposition": f"inline; filename={file_name}", **cache_headers}
         )
         
     except HTTPException:
@@ -350,72 +577,35 @@ async def get_document_pdf(document_id: int):
 
 @app.get("/api/documents", response_model=List[DocumentSummary])
 async def get_documents(
+    response: Response,
     file_name: Optional[str] = Query(None, description="Filter by file name"),
     po_number: Optional[str] = Query(None, description="Filter by PO number"),
     supplier_name: Optional[str] = Query(None, description="Filter by supplier name"),
     document_status: Optional[str] = Query(None, description="Filter by document status"),
     limit: int = Query(100, description="Maximum number of results"),
-    offset: int = Query(0, description="Offset for pagination")
+    offset: int = Query(0, description="Offset for pagination"),
+    cursor_created_at: Optional[datetime] = Query(None, description="Keyset cursor: created_at of the last row seen"),
+    cursor_id: Optional[int] = Query(None, description="Keyset cursor: id of the last row seen")
 ):
     """Get list of all processed documents with enhanced filters"""
     try:
-        conn = db_service.get_connection()
-        cursor = conn.cursor()
-        
-        # Enhanced query with all required fields
-        query = """
-        SELECT DISTINCT
-            dp.id,
-            dp.file_name,
-            dp.processing_status,
-            dp.document_status,
-            dp.min_confidence,
-            dp.exception_reason_code,
-            dp.exception_reason_description,
-            dp.created_at,
-            dp.updated_at,
-            dp.error_message,
-            po.entity_value as po_number,
-            supplier.entity_value as supplier_name,
-            inv_date.entity_value as invoice_date,
-            inv_type.entity_value as invoice_type
-        FROM document_processing dp
-        LEFT JOIN extracted_entities po ON dp.id = po.processing_id AND po.entity_name = 'po_number'
-        LEFT JOIN extracted_entities supplier ON dp.id = supplier.processing_id AND supplier.entity_name = 'vendor_name'
-        LEFT JOIN extracted_entities inv_date ON dp.id = inv_date.processing_id AND inv_date.entity_name = 'invoice_date'
-        LEFT JOIN extracted_entities inv_type ON dp.id = inv_type.processing_id AND inv_type.entity_name = 'invoice_type'
-        WHERE 1=1
-        """
-        
-        params = []
-        
-        # Add filters
-        if file_name:
-            query += " AND dp.file_name ILIKE %s"
-            params.append(f"%{file_name}%")
-            
-        if po_number:
-            query += " AND po.entity_value ILIKE %s"
-            params.append(f"%{po_number}%")
-            
-        if supplier_name:
-            query += " AND supplier.entity_value ILIKE %s"
-            params.append(f"%{supplier_name}%")
-            
-        if document_status:
-            query += " AND dp.document_status = %s"
-            params.append(document_status)
-        
-        # Add ordering and pagination
-        query += " ORDER BY dp.created_at DESC LIMIT %s OFFSET %s"
-        params.extend([limit, offset])
-        
-        cursor.execute(query, params)
-        results = cursor.fetchall()
+        async with app.state.pg_pool.acquire() as conn:
+            results = await conn.fetch(
+                Q_DOCS_LIST,
+                _ilike_pattern(file_name),
+                _ilike_pattern(po_number),
+                _ilike_pattern(supplier_name),
+                document_status or None,
+                limit,
+                offset,
+                cursor_created_at,
+                cursor_id
+            )
+        _set_next_cursor(response, results, limit, created_at_index=7)
         
-        documents = []
-        for row in results:
-            documents.append(DocumentSummary(
+        # Rows come straight from our own schema; skip per-row validation
+        return [
+            DocumentSummary.model_construct(
                 id=row[0],
                 file_name=row[1],
                 processing_status=row[2],
@@ -431,12 +621,9 @@ async def get_documents(
                 supplier_name=row[11],
                 invoice_date=row[12],
                 invoice_type=row[13]
-            ))
-        
-        cursor.close()
-        conn.close()
-        
-        return documents
+            )
+            for row in results
+        ]
         
     except Exception as e:
         logger.error(f"Failed to get documents: {str(e)}")
@@ -447,56 +634,21 @@ async def get_documents(
 async def get_document_detail(document_id: int):
     """Get detailed information for a specific document"""
     try:
-        conn = db_service.get_connection()
-        cursor = conn.cursor()
-        
-        # Get document processing record
-        cursor.execute("""
-            SELECT id, file_name, gcs_path, processing_status, 
-                   document_status, min_confidence, exception_reason_code, 
-                   exception_reason_description, exception_entities, 
-                   created_at, updated_at, error_message
-            FROM document_processing 
-            WHERE id = %s
-        """, (document_id,))
-        
-        doc_result = cursor.fetchone()
+        # Get document processing record together with its extracted entities
+        async with app.state.pg_pool.acquire() as conn:
+            doc_result = await conn.fetchrow(Q_DOC_DETAIL, document_id)
+        
         if not doc_result:
-            cursor.close()
-            conn.close()
             raise HTTPException(status_code=404, detail="Document not found")
         
-        # Get extracted entities
-        cursor.execute("""
-            SELECT entity_name, entity_value, confidence_score, page_number
-            FROM extracted_entities 
-            WHERE processing_id = %s
-            ORDER BY entity_name, confidence_score DESC
-        """, (document_id,))
-        
-        entity_results = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
-        
-        # Build entities list
-        entities_list = []
-        for row in entity_results:
-            entities_list.append({
-                'entity_name': row[0],
-                'entity_value': row[1],
-                'confidence': row[2],
-                'page_number': row[3]
-            })
-        
-        # Parse exception entities JSON if present
-        exception_entities = []
-        if doc_result[8]:  # exception_entities column (adjusted index)
-            import json
-            try:
-                exception_entities = json.loads(doc_result[8])
-            except:
-                pass
+        # json/jsonb columns arrive already decoded by the pool's codec
+        entities_list = doc_result['entities']
+        
+        exception_entities = doc_result[8] or []  # exception_entities column
+        # Stored as a single JSON object; the response model expects a list, so the
+        # object is returned wrapped (see DocumentDetail.exception_entities)
+        if isinstance(exception_entities, dict):
+            exception_entities = [exception_entities]
         
         return DocumentDetail(
             id=doc_result[0],
@@ -525,19 +677,46 @@ async def get_document_detail(document_id: int):
         raise HTTPException(status_code=500, detail="Failed to retrieve document details")
 
 
-
-
-
 @app.get("/api/documents/{document_id}/raw")
-async def get_document_raw_output(document_id: int):
+async def get_document_raw_output(document_id: int, request: Request):
     """Get raw DocumentAI output for a specific document"""
     try:
-        raw_data = db_service.get_raw_processor_output(document_id)
-        
-        if not raw_data:
-            raise HTTPException(status_code=404, detail="Raw output not found")
-        
-        return raw_data['raw_processor_output']
+        async with app.state.pg_pool.acquire() as conn:
+            # Version check only; the large JSONB value is not read here
+            version = await conn.fetchrow("""
+                SELECT updated_at, raw_processor_output_uri FROM document_processing
+                WHERE id = $1
+                AND (raw_processor_output IS NOT NULL OR raw_processor_output_uri IS NOT NULL)
+            """, document_id)
+            
+            if not version:
+                raise HTTPException(status_code=404, detail="Raw output not found")
+            
+            etag = _raw_output_etag(document_id, version[0])
+            headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+            
+            if _etag_matches(request.headers.get("if-none-match"), etag):
+                return Response(status_code=304, headers=headers)
+            
+            cached = _raw_output_cache.get(document_id)
+            raw_output_uri = version[1]
+            if cached and cached[0] == etag:
+                _raw_output_cache.move_to_end(document_id)
+                raw_output = cached[1]
+                raw_output_uri = None
+            elif not raw_output_uri:
+                # Read as text so the stored JSON passes through without decode/re-encode
+                raw_output = await conn.fetchval("""
+                    SELECT raw_processor_output::text FROM document_processing WHERE id = $1
+                """, document_id)
+                _cache_raw_output(document_id, etag, raw_output)
+        
+        if raw_output_uri:
+            # Offloaded to GCS: download after the connection is released; the object is already JSON
+            raw_output = await asyncio.to_thread(gcs_manager.download_bytes, raw_output_uri)
+            _cache_raw_output(document_id, etag, raw_output)
+        
+        return Response(content=raw_output, media_type="application/json", headers=headers)
         
     except HTTPException:
         raise
@@ -550,44 +729,58 @@ async def get_document_raw_output(document_id: int):
 async def upload_files(files: List[UploadFile] = File(...)):
     """Upload multiple PDF files to GCS input folder"""
     try:
-        uploaded_files = []
-        failed_files = []
+        bucket = gcs_manager.bucket
+        semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+        
+        async def upload_one(file: UploadFile):
+            """Upload a single file, returning (uploaded_info, failure_info)"""
+            async with semaphore:
+                try:
+                    # Validate file type
+                    if not file.filename.lower().endswith('.pdf'):
+                        return None, {
+                            "file_name": file.filename,
+                            "error": "Not a PDF file"
+                        }
+                    
+                    # Upload to GCS input folder without blocking the event loop,
+                    # streaming from the spooled upload file (no in-memory copy)
+                    blob_name = f"{gcs_manager.input_folder}/{file.filename}"
+                    blob = bucket.blob(blob_name)
+                    if file.size is None or file.size > MULTIPART_UPLOAD_MAX_SIZE:
+                        blob.chunk_size = UPLOAD_CHUNK_SIZE
+                    
+                    await asyncio.to_thread(
+                        blob.upload_from_file,
+                        file.file,
+                        content_type="application/pdf",
+                        rewind=True,
+                        size=file.size
+                    )
+                    logger.info(f"Uploaded file: {file.filename}")
+                    
+                    return {
+                        "file_name": file.filename,
+                        "size": file.size,
+                        "gcs_path": f"gs://{gcs_manager.bucket_name}/{blob_name}",
+                        "upload_time": datetime.now().isoformat()
+                    }, None
+                    
+                except Exception as e:
+                    logger.error(f"Failed to upload {file.filename}: {str(e)}")
+                    return None, {
+                        "file_name": file.filename,
+                        "error": str(e)
+                    }
         
-        bucket = gcs_manager.client.bucket(gcs_manager.bucket_name)
+        # Upload all files concurrently; total time is bounded by the slowest upload
+        results = await asyncio.gather(*(upload_one(file) for file in files))
         
-        for file in files:
-            try:
-                # Validate file type
-                if not file.filename.lower().endswith('.pdf'):
-                    failed_files.append({
-                        "file_name": file.filename,
-                        "error": "Not a PDF file"
-                    })
-                    continue
-                
-                # Read file content
-                content = await file.read()
-                
-                # Upload to GCS input folder
-                blob_name = f"{gcs_manager.input_folder}/{file.filename}"
-                blob = bucket.blob(blob_name)
-                
-                blob.upload_from_string(content, content_type="application/pdf")
-                uploaded_files.append({
-                    "file_name": file.filename,
-                    "size": len(content),
-                    "gcs_path": f"gs://{gcs_manager.bucket_name}/{blob_name}",
-                    "upload_time": datetime.now().isoformat()
-                })
-                
-                logger.info(f"Uploaded file: {file.filename}")
-                
-            except Exception as e:
-                failed_files.append({
-                    "file_name": file.filename,
-                    "error": str(e)
-                })
-                logger.error(f"Failed to upload {file.filename}: {str(e)}")
+        uploaded_files = [uploaded for uploaded, _ in results if uploaded]
+        failed_files = [failed for _, failed in results if failed]
+        
+        if uploaded_files:
+            invalidate_stats_cache()
         
         return UploadResponse(
             success=len(uploaded_files) > 0,
@@ -603,31 +796,39 @@ async def upload_files(files: List[UploadFile] = File(...)):
 
 @app.post("/api/trigger-processing", response_model=ProcessingTriggerResponse)
 async def trigger_processing():
-    """Trigger the Cloud Run job for processing uploaded files"""
+    """Trigger processing of uploaded files as a background job"""
     try:
-        # You can implement this in several ways:
-        # 1. Call the Cloud Run job URL directly
-        # 2. Use Cloud Scheduler API to trigger the job
-        # 3. Run the processing directly (for testing)
-        
-        # For now, let's run processing directly in background
-        async def run_processing():
-            try:
-                summary = invoice_processor.process_all_invoices()
-                logger.info(f"Processing completed: {summary}")
-                return summary
-            except Exception as e:
-                logger.error(f"Processing failed: {str(e)}")
-                raise
-        
-        # Run in background
-        loop = asyncio.get_event_loop()
-        task = loop.run_in_executor(executor, lambda: invoice_processor.process_all_invoices())
+        # Only one run at a time; a second run would pick up the same input files
+        for job_id, task in jobs.items():
+            if not task.done():
+                return ProcessingTriggerResponse(
+                    success=True,
+                    message="Processing job already running",
+                    triggered_files=[],
+                    job_id=job_id
+                )
+        
+        # List the input folder here so the response names the files; the job reuses it
+        file_infos = await asyncio.to_thread(gcs_manager.list_input_file_info, '.pdf')
+        if not file_infos:
+            return ProcessingTriggerResponse(
+                success=False,
+                message="No PDF files found in input folder",
+                triggered_files=[]
+            )
+        
+        # The blocking pipeline runs on a worker thread; the task keeps the result
+        job_id = uuid4().hex
+        task = asyncio.create_task(asyncio.to_thread(invoice_processor.process_all_invoices, file_infos))
+        # Processed documents change the dashboard numbers once the run finishes
+        task.add_done_callback(lambda _: invalidate_stats_cache())
+        _track_job(job_id, task)
         
         return ProcessingTriggerResponse(
             success=True,
-            message="Processing job started",
-            job_url=None  # Could include Cloud Run job URL
+            message=f"Processing job started for {len(file_infos)} files",
+            triggered_files=list(file_infos),
+            job_id=job_id
         )
         
     except Exception as e:
@@ -635,90 +836,90 @@ async def trigger_processing():
         raise HTTPException(status_code=500, detail="Failed to trigger processing")
 
 
-@app.get("/api/processing/status")
+@app.get("/api/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """Get the status of a background processing job"""
+    task = jobs.get(job_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if not task.done():
+        return {"job_id": job_id, "status": "RUNNING"}
+    
+    if task.exception() is not None:
+        logger.error(f"Processing job {job_id} failed: {str(task.exception())}")
+        return {"job_id": job_id, "status": "FAILED", "error": str(task.exception())}
+    
+    return {"job_id": job_id, "status": "COMPLETED", "summary": task.result()}
+
+
+@app.get("/api/processing/status", response_model=ProcessingStatusResponse)
 async def get_processing_status():
     """Get current processing status"""
     try:
         # Get recent processing activity
-        conn = db_service.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT 
-                processing_status,
-                COUNT(*) as count,
-                MAX(created_at) as last_processed
-            FROM document_processing 
-            WHERE created_at >= NOW() - INTERVAL '1 hour'
-            GROUP BY processing_status
-        """)
-        
-        recent_activity = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        
-        return {
-            "recent_activity": [
-                {
-                    "status": row[0],
-                    "count": row[1],
-                    "last_processed": row[2]
-                }
+        async with app.state.pg_pool.acquire() as conn:
+            recent_activity = await conn.fetch("""
+                SELECT 
+                    processing_status,
+                    COUNT(*) as count,
+                    MAX(created_at) as last_processed
+                FROM document_processing 
+                WHERE created_at >= NOW() - INTERVAL '1 hour'
+                GROUP BY processing_status
+            """)
+        
+        return ProcessingStatusResponse(
+            recent_activity=[
+                ProcessingActivity(
+                    status=row[0],
+                    count=row[1],
+                    last_processed=row[2]
+                )
                 for row in recent_activity
             ]
-        }
+        )
         
     except Exception as e:
         logger.error(f"Failed to get processing status: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to get processing status")
 
 
-
-
-## Removed duplicate '/api/upload' and '/api/trigger-processing' definitions below.
-## The canonical endpoints are defined earlier in this file:
-## - POST /api/upload: uploads PDFs into the configured input folder of the main bucket
-## - POST /api/trigger-processing: kicks off processing using the executor
-
 @app.get("/api/stats")
 async def get_dashboard_stats():
     """Get dashboard statistics"""
+    cached = _get_cached_stats("dashboard_stats")
+    if cached is not None:
+        return cached
+    
     try:
-        conn = db_service.get_connection()
-        cursor = conn.cursor()
-        
-        # Get document counts by status
-        cursor.execute("""
-            SELECT document_status, COUNT(*) 
-            FROM document_processing 
-            GROUP BY document_status
-        """)
-        status_counts = dict(cursor.fetchall())
-        
-        # Get average confidence
-        cursor.execute("""
-            SELECT AVG(min_confidence) 
-            FROM document_processing 
-            WHERE min_confidence IS NOT NULL
-        """)
-        avg_confidence = cursor.fetchone()[0] or 0
-        
-        # Get recent activity (last 24 hours)
-        cursor.execute("""
-            SELECT COUNT(*) 
-            FROM document_processing 
-            WHERE created_at >= NOW() - INTERVAL '24 hours'
-        """)
-        recent_activity = cursor.fetchone()[0] or 0
-        
-        # Get total processed documents
-        cursor.execute("SELECT COUNT(*) FROM document_processing")
-        total_documents = cursor.fetchone()[0] or 0
-        
-        cursor.close()
-        conn.close()
+        async with app.state.pg_pool.acquire() as conn:
+            # Get document counts by status
+            rows = await conn.fetch("""
+                SELECT document_status, COUNT(*) 
+                FROM document_processing 
+                GROUP BY document_status
+            """)
+            status_counts = {row[0]: row[1] for row in rows}
+            
+            # Get average confidence
+            avg_confidence = await conn.fetchval("""
+                SELECT AVG(min_confidence) 
+                FROM document_processing 
+                WHERE min_confidence IS NOT NULL
+            """) or 0
+            
+            # Get recent activity (last 24 hours)
+            recent_activity = await conn.fetchval("""
+                SELECT COUNT(*) 
+                FROM document_processing 
+                WHERE created_at >= NOW() - INTERVAL '24 hours'
+            """) or 0
+            
+            # Get total processed documents
+            total_documents = await conn.fetchval("SELECT COUNT(*) FROM document_processing") or 0
         
-        return {
+        result = {
             "total_documents": total_documents,
             "status_breakdown": status_counts,
             "average_confidence": round(float(avg_confidence), 2) if avg_confidence else 0,
@@ -727,11 +928,19 @@ async def get_dashboard_stats():
                 (status_counts.get("SUCCESS", 0) / max(total_documents, 1)) * 100, 2
             )
         }
+        _set_cached_stats("dashboard_stats", result)
+        return result
         
     except Exception as e:
         logger.error(f"Failed to get stats: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to retrieve statistics")
 
+@app.post("/api/cache/invalidate")
+async def invalidate_cache():
+    """Invalidate cached statistics (called after uploads and processing runs)"""
+    invalidate_stats_cache()
+    return {"success": True, "message": "Statistics cache cleared"}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
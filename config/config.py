@@ -1,4 +1,8 @@
 """Configuration settings for Document AI Invoice Processor"""
+import functools
+import os
+from dataclasses import dataclass
+from typing import NamedTuple, Optional
 
 # GCP Configuration
 PROJECT_ID = "tss-gen-ai"
@@ -10,6 +14,7 @@ BUCKET_NAME = "sample_invoice_bucket_coe"
 INPUT_FOLDER = "input"
 PROCESSED_FOLDER = "processed"
 FAILED_FOLDER = "failed"
+RAW_OUTPUT_FOLDER = "raw"  # raw processor outputs too large to keep in Postgres
 
 # Database Configuration
 DB_CONFIG = {
@@ -37,9 +42,16 @@ REQUIRED_ENTITIES = [
     'vendor_name'
 ]
 
+# Set view of REQUIRED_ENTITIES for O(1) membership tests and set differences
+REQUIRED_ENTITIES_SET = frozenset(REQUIRED_ENTITIES)
+
 # Processing configuration
 MIN_CONFIDENCE_THRESHOLD = 0.70  # 70% confidence threshold
 
+# Invoices processed in parallel per run; keep within the Document AI
+# requests-per-minute quota (QUOTA_ERR failures mean this is too high)
+PROCESSING_CONCURRENCY = int(os.getenv('DOC_AI_CONCURRENCY', '16'))
+
 # Exception codes for document validation failures
 EXCEPTION_CODES = {
     'MISSING_ENTITIES': 'MISS_ENT',
@@ -55,6 +67,11 @@ EXCEPTION_CODES = {
     'MIXED_VALIDATION': 'MIX_VAL'  # Both missing entities and low confidence
 }
 
+# Codes used on the per-document validation path, resolved once at import
+_CODE_MIXED, _CODE_MISSING, _CODE_LOW_CONF = (
+    EXCEPTION_CODES[key] for key in ('MIXED_VALIDATION', 'MISSING_ENTITIES', 'LOW_CONFIDENCE')
+)
+
 # Exception descriptions mapping
 EXCEPTION_DESCRIPTIONS = {
     'MISS_ENT': 'Required entities are missing from the document',
@@ -70,6 +87,95 @@ EXCEPTION_DESCRIPTIONS = {
     'MIX_VAL': 'Multiple validation issues: missing entities and low confidence'
 }
 
+# Validation outcome as a 3-bit key: missing entities (4), low confidence
+# entities (2), minimum confidence below threshold (1). Status, exception code,
+# description template and reason are all looked up by that key.
+def _validation_key(missing_entities, low_confidence_entities, min_confidence):
+    """Encode a validation result as an index into the lookup tables below"""
+    return ((bool(missing_entities) << 2)
+            | (bool(low_confidence_entities) << 1)
+            | (min_confidence is not None and min_confidence < MIN_CONFIDENCE_THRESHOLD))
+
+_STATUS_BY_KEY = (
+    'SUCCESS',                          # all good
+    'PENDING_REVIEW',                   # overall confidence too low = needs review
+    'PENDING_REVIEW', 'PENDING_REVIEW', # low confidence = needs review
+    'FAILED', 'FAILED', 'FAILED', 'FAILED'  # missing entities = hard failure
+)
+
+_CODE_BY_KEY = (
+    None, _CODE_LOW_CONF, _CODE_LOW_CONF, _CODE_LOW_CONF,
+    _CODE_MISSING, _CODE_MISSING, _CODE_MIXED, _CODE_MIXED
+)
+
+_DESCRIPTION_BY_KEY = (
+    None,
+    "Minimum confidence ({min_confidence:.2f}) below threshold ({threshold})",
+    "Low confidence entities (< {threshold}): {low}",
+    "Low confidence entities (< {threshold}): {low}",
+    "Missing required entities: {missing}",
+    "Missing required entities: {missing}",
+    "Missing entities: {missing}; Low confidence entities: {low}",
+    "Missing entities: {missing}; Low confidence entities: {low}"
+)
+
+@functools.lru_cache(maxsize=512)
+def _classify_exception(missing_names, low_conf_names, low_min_confidence):
+    """
+    Exception code and description for one validation signature
+    
+    Failing documents mostly repeat a few signatures (e.g. only hsn_number
+    missing), so the formatted description is memoized on hashable inputs.
+    
+    Args:
+        missing_names: Tuple of missing entity names
+        low_conf_names: Tuple of low confidence entity names
+        low_min_confidence: Minimum confidence rounded to 2 decimals when it is
+            below the threshold, else None
+    
+    Returns:
+        Tuple of (exception_code, exception_description, reason) or (None, None, None)
+    """
+    key = _validation_key(missing_names, low_conf_names, None) | (low_min_confidence is not None)
+    if not key:
+        return None, None, None
+    
+    desc = _DESCRIPTION_BY_KEY[key].format(
+        missing=list(missing_names),
+        low=list(low_conf_names),
+        min_confidence=low_min_confidence,
+        threshold=MIN_CONFIDENCE_THRESHOLD
+    )
+    reason = "min_confidence_below_threshold" if key == 1 else None
+    return _CODE_BY_KEY[key], desc, reason
+
+class EntityRec(NamedTuple):
+    """Low confidence entity as passed to get_exception_details"""
+    name: str
+    confidence: Optional[float]
+    value: Optional[str] = None
+
+@dataclass(slots=True, frozen=True)
+class DocRecord:
+    """document_processing row passed from validation to DatabaseService.store_document_record"""
+    file_name: str
+    gcs_path: str
+    processing_status: str
+    document_status: Optional[str] = None
+    min_confidence: Optional[float] = None
+    exception_code: Optional[str] = None
+    exception_desc: Optional[str] = None
+    exception_entities: Optional[dict] = None
+    error_message: Optional[str] = None
+
+def _as_entity_rec(entity) -> EntityRec:
+    """Normalize a dict or bare entity name into an EntityRec"""
+    if isinstance(entity, EntityRec):
+        return entity
+    if isinstance(entity, dict):
+        return EntityRec(entity.get('name'), entity.get('confidence'), entity.get('value'))
+    return EntityRec(str(entity), None)
+
 def get_exception_details(missing_entities=None, low_confidence_entities=None, min_confidence=None):
     """
     Generate exception code, description, and entity details based on validation results
@@ -77,57 +183,46 @@ def get_exception_details(missing_entities=None, low_confidence_entities=None, m
     Args:
         missing_entities: List of missing required entities
         low_confidence_entities: List of entities with confidence below threshold
+            (EntityRec, dicts with name/confidence, or plain names)
         min_confidence: Minimum confidence among all extracted entities
         
     Returns:
-        Tuple of (exception_code, exception_description, exception_entities_json)
+        Tuple of (exception_code, exception_description, exception_entities_json),
+        in DocRecord field order
     """
-    has_missing = missing_entities and len(missing_entities) > 0
-    has_low_conf = low_confidence_entities and len(low_confidence_entities) > 0
+    # Normalize once; everything below uses attribute access only
+    low_conf_recs = [_as_entity_rec(entity) for entity in (low_confidence_entities or ())]
+    missing_names = tuple(missing_entities or ())
+    low_conf_names = tuple(rec.name for rec in low_conf_recs)
     
-    # Prepare exception entities JSON
+    # min_confidence only matters when nothing else failed; the threshold is checked on
+    # the exact value, then it is rounded to the 2 decimals the description shows so
+    # documents with nearby scores share a memo entry
+    low_min_confidence = None
+    if (not (missing_names or low_conf_names) and min_confidence is not None
+            and min_confidence < MIN_CONFIDENCE_THRESHOLD):
+        low_min_confidence = round(min_confidence, 2)
+    code, desc, reason = _classify_exception(missing_names, low_conf_names, low_min_confidence)
+    if code is None:
+        return None, None, None
+    
+    # Prepare exception entities JSON, formatting low confidence entities with details
+    # (built fresh per call so callers never share a mutable result)
     exception_entities = {
         "missing": missing_entities or [],
-        "low_confidence": []
+        "low_confidence": [
+            {"name": rec.name, "confidence": rec.confidence, "threshold": MIN_CONFIDENCE_THRESHOLD}
+            for rec in low_conf_recs
+        ]
     }
     
-    # Format low confidence entities with details
-    if low_confidence_entities:
-        for entity in low_confidence_entities:
-            if isinstance(entity, dict):
-                exception_entities["low_confidence"].append({
-                    "name": entity.get("name"),
-                    "confidence": entity.get("confidence"),
-                    "threshold": MIN_CONFIDENCE_THRESHOLD
-                })
-            else:
-                exception_entities["low_confidence"].append({
-                    "name": str(entity),
-                    "confidence": None,
-                    "threshold": MIN_CONFIDENCE_THRESHOLD
-                })
-    
     # Add min_confidence info if provided
     if min_confidence is not None:
         exception_entities["min_confidence"] = min_confidence
         exception_entities["confidence_threshold"] = MIN_CONFIDENCE_THRESHOLD
     
-    if has_missing and has_low_conf:
-        code = EXCEPTION_CODES['MIXED_VALIDATION']
-        desc = f"Missing entities: {missing_entities}; Low confidence entities: {[e['name'] if isinstance(e, dict) else e for e in low_confidence_entities]}"
-    elif has_missing:
-        code = EXCEPTION_CODES['MISSING_ENTITIES'] 
-        desc = f"Missing required entities: {missing_entities}"
-    elif has_low_conf:
-        code = EXCEPTION_CODES['LOW_CONFIDENCE']
-        low_conf_names = [e['name'] if isinstance(e, dict) else e for e in low_confidence_entities]
-        desc = f"Low confidence entities (< {MIN_CONFIDENCE_THRESHOLD}): {low_conf_names}"
-    elif min_confidence is not None and min_confidence < MIN_CONFIDENCE_THRESHOLD:
-        code = EXCEPTION_CODES['LOW_CONFIDENCE']
-        desc = f"Minimum confidence ({min_confidence:.2f}) below threshold ({MIN_CONFIDENCE_THRESHOLD})"
-        exception_entities["reason"] = "min_confidence_below_threshold"
-    else:
-        return None, None, None
+    if reason:
+        exception_entities["reason"] = reason
         
     return code, desc, exception_entities
 
@@ -144,13 +239,9 @@ def calculate_min_confidence(entities):
     if not entities:
         return None
     
-    confidences = []
-    for entity in entities:
-        confidence = entity.get('confidence')
-        if confidence is not None:
-            confidences.append(confidence)
-    
-    return min(confidences) if confidences else None
+    # Single pass, no intermediate list; min() consumes the generator in C
+    confidences = (entity.get('confidence') for entity in entities)
+    return min((c for c in confidences if c is not None), default=None)
 
 def determine_document_status(missing_entities, low_confidence_entities, min_confidence):
     """
@@ -164,17 +255,7 @@ def determine_document_status(missing_entities, low_confidence_entities, min_con
     Returns:
         Document status: 'SUCCESS', 'FAILED', or 'PENDING_REVIEW'
     """
-    has_missing = missing_entities and len(missing_entities) > 0
-    has_low_conf = low_confidence_entities and len(low_confidence_entities) > 0
-    
-    if has_missing:
-        return 'FAILED'  # Missing entities = hard failure
-    elif has_low_conf:
-        return 'PENDING_REVIEW'  # Low confidence = needs review
-    elif min_confidence is not None and min_confidence < MIN_CONFIDENCE_THRESHOLD:
-        return 'PENDING_REVIEW'  # Overall confidence too low = needs review
-    else:
-        return 'SUCCESS'  # All good
+    return _STATUS_BY_KEY[_validation_key(missing_entities, low_confidence_entities, min_confidence)]
 
 # Working directory
 WORKING_DIR = "/home/si_akram/document_ai_poc"
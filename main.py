@@ -17,29 +17,40 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Banner line for job log sections
+_BAR = "=" * 80
+
+# Processor reused across invocations in a warm container
+_processor = None
+
+
+def _get_processor() -> InvoiceProcessor:
+    """Return the module-level InvoiceProcessor, creating it on first use"""
+    global _processor
+    if _processor is None:
+        _processor = InvoiceProcessor()
+    return _processor
+
 
 def main():
     """Main function for Cloud Run Job"""
     try:
-        logger.info("=" * 80)
+        logger.info(_BAR)
         logger.info("🚀 Starting Invoice Processing Cloud Run Job")
-        logger.info(f"⏰ Execution time: {datetime.now().isoformat()}")
-        logger.info("=" * 80)
-        
-        # Initialize processor
-        processor = InvoiceProcessor()
+        logger.info("⏰ Execution time: %s", datetime.now().isoformat())
+        logger.info(_BAR)
         
         # Process all invoices in the input folder
-        summary = processor.process_all_invoices()
+        summary = _get_processor().process_all_invoices()
         
         # Log results
-        logger.info("\n" + "=" * 80)
+        logger.info("\n%s", _BAR)
         logger.info("📊 JOB EXECUTION SUMMARY")
-        logger.info("=" * 80)
-        logger.info(f"Total files processed: {summary['total_files']}")
-        logger.info(f"✅ Successful: {summary['successful']}")
-        logger.info(f"❌ Failed: {summary['failed']}")
-        logger.info("=" * 80)
+        logger.info(_BAR)
+        logger.info("Total files processed: %d", summary['total_files'])
+        logger.info("✅ Successful: %d", summary['successful'])
+        logger.info("❌ Failed: %d", summary['failed'])
+        logger.info(_BAR)
         
         # Exit with appropriate code
         if summary['failed'] > 0 and summary['successful'] == 0:
@@ -53,7 +64,7 @@ def main():
             sys.exit(0)
             
     except Exception as e:
-        logger.error(f"❌ Job failed with error: {str(e)}", exc_info=True)
+        logger.error("❌ Job failed with error: %s", e, exc_info=True)
         sys.exit(1)
 
 
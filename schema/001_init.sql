@@ -0,0 +1,99 @@
+-- 001: document_processing / extracted_entities tables, comments and indexes
+
+-- Document AI processing status as a 4-byte enum; labels are in alphabetical order
+-- so ORDER BY processing_status sorts as it did for the text column
+DO $$ BEGIN
+    CREATE TYPE processing_status_t AS ENUM ('FAILED', 'PROCESSING', 'SUCCESS');
+EXCEPTION WHEN duplicate_object THEN NULL;
+END $$;
+
+-- Create document processing table with raw processor output
+CREATE TABLE IF NOT EXISTS document_processing (
+    id SERIAL PRIMARY KEY,
+    file_name TEXT NOT NULL,
+    gcs_path TEXT NOT NULL,
+    processing_status processing_status_t NOT NULL,
+    document_status TEXT CHECK (document_status IN ('SUCCESS', 'FAILED', 'PENDING', 'PENDING_REVIEW')),
+    min_confidence DECIMAL(3,2),
+    exception_reason_code TEXT,
+    exception_reason_description TEXT,
+    exception_entities JSONB,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    error_message TEXT,
+    raw_processor_output JSONB
+);
+
+-- Create entities table with bounding box support
+CREATE TABLE IF NOT EXISTS extracted_entities (
+    id SERIAL PRIMARY KEY,
+    processing_id INTEGER REFERENCES document_processing(id) ON DELETE CASCADE,
+    entity_name TEXT NOT NULL,
+    entity_value TEXT,
+    confidence_score DECIMAL(3,2),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    page_number INTEGER,
+    bounding_box JSONB
+);
+
+COMMENT ON COLUMN document_processing.processing_status IS
+'Document AI processing status: SUCCESS (AI processed successfully), FAILED (AI processing failed due to network/service issues), PROCESSING (currently being processed)';
+
+COMMENT ON COLUMN document_processing.document_status IS
+'Document extraction validation status: SUCCESS (all entities extracted with confidence above threshold), FAILED (missing entities), PENDING (not yet validated), PENDING_REVIEW (all entities present but min confidence below threshold)';
+
+COMMENT ON COLUMN document_processing.min_confidence IS
+'Minimum confidence score among all extracted entities (0.00-1.00). Used to determine if document needs review.';
+
+COMMENT ON COLUMN document_processing.exception_reason_code IS
+'Exception code for validation failures: MISSING_ENTITIES, LOW_CONFIDENCE, PROCESSING_ERROR, etc.';
+
+COMMENT ON COLUMN document_processing.exception_reason_description IS
+'Detailed description of validation failures including specific missing entities or low confidence fields';
+
+COMMENT ON COLUMN document_processing.exception_entities IS
+'JSON object containing details of entities that caused exceptions: {"missing": [], "low_confidence": [{"name": "...", "confidence": 0.xx}]}';
+
+COMMENT ON COLUMN extracted_entities.bounding_box IS
+'Bounding box coordinates in format: {"vertices": [{"x": float, "y": float}, ...], "normalized_vertices": [{"x": float, "y": float}, ...]}';
+
+COMMENT ON COLUMN document_processing.raw_processor_output IS
+'Complete raw output from Document AI processor in JSON format for future analysis and reprocessing';
+
+-- Raw Document AI output is 0.5-5 MB per invoice: keep it compressed out of line
+-- and move any row over 128 bytes to TOAST so list/stat scans read a small heap
+ALTER TABLE document_processing ALTER COLUMN raw_processor_output SET STORAGE EXTENDED;
+ALTER TABLE document_processing SET (toast_tuple_target = 128);
+
+-- Vacuum entities sooner so the visibility map stays current for index-only scans
+ALTER TABLE extracted_entities SET (autovacuum_vacuum_scale_factor = 0.05);
+
+-- Create indexes for performance
+-- Work queue / retry lookups only look for the PROCESSING and FAILED minority;
+-- SUCCESS rows (the bulk of the table) stay out of this index
+CREATE INDEX IF NOT EXISTS idx_document_processing_status_active ON document_processing(processing_status, created_at) WHERE processing_status IN ('PROCESSING', 'FAILED');
+CREATE INDEX IF NOT EXISTS idx_document_processing_document_status ON document_processing(document_status);
+CREATE INDEX IF NOT EXISTS idx_document_processing_exception_code ON document_processing(exception_reason_code);
+CREATE INDEX IF NOT EXISTS idx_document_processing_min_confidence ON document_processing(min_confidence);
+CREATE INDEX IF NOT EXISTS idx_extracted_entities_name ON extracted_entities(entity_name);
+-- Per-document entity reads (also serves the processing_id foreign key)
+CREATE INDEX IF NOT EXISTS idx_extracted_entities_lookup ON extracted_entities(processing_id, entity_name, confidence_score DESC) INCLUDE (entity_value);
+
+-- Performance indexes for new schema
+CREATE INDEX IF NOT EXISTS idx_document_processing_file_name ON document_processing(file_name);
+CREATE INDEX IF NOT EXISTS idx_document_processing_status_created ON document_processing(processing_status, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_document_processing_created_id ON document_processing(created_at DESC, id DESC);
+-- No gcs_path index: nothing looks documents up by path, so it would only cost writes
+
+-- Trigram indexes so substring (ILIKE '%...%') filters avoid sequential scans
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS idx_document_processing_file_name_trgm ON document_processing USING gin(file_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_extracted_entities_value_trgm ON extracted_entities USING gin(entity_value gin_trgm_ops) WHERE entity_name IN ('po_number', 'vendor_name');
+
+-- GIN index for JSONB columns for efficient searching
+-- No GIN index on bounding_box: jsonb_ops only serves containment/existence, not the
+-- ->/->> coordinate reads; page/region queries use idx_extracted_entities_bbox (002_bbox.sql).
+-- If containment queries appear, use a narrow gin(bounding_box jsonb_path_ops).
+-- No GIN index on raw_processor_output: nothing queries it by key, and indexing
+-- megabyte-sized documents made every insert expensive
+CREATE INDEX IF NOT EXISTS idx_document_processing_exception_entities_gin ON document_processing USING gin(exception_entities);
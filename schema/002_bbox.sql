@@ -0,0 +1,15 @@
+-- 002: bounding box extent as numeric columns for indexed page/region queries
+
+-- Min/max of normalized_vertices; bounding_box JSONB is kept for audit
+ALTER TABLE extracted_entities
+ADD COLUMN IF NOT EXISTS bbox_xmin DOUBLE PRECISION,
+ADD COLUMN IF NOT EXISTS bbox_ymin DOUBLE PRECISION,
+ADD COLUMN IF NOT EXISTS bbox_xmax DOUBLE PRECISION,
+ADD COLUMN IF NOT EXISTS bbox_ymax DOUBLE PRECISION;
+
+COMMENT ON COLUMN extracted_entities.bbox_xmin IS
+'Extent of normalized_vertices (0-1 scale) as plain columns for indexed page/region queries; bounding_box is kept for audit';
+
+-- "Entities on page N inside region R": range scans on the numeric bbox extent
+-- (page_number alone is served by this index too)
+CREATE INDEX IF NOT EXISTS idx_extracted_entities_bbox ON extracted_entities(page_number, bbox_xmin, bbox_ymin, bbox_xmax, bbox_ymax);
@@ -0,0 +1,14 @@
+-- 003: table storage parameters matched to each table's write pattern
+
+-- document_processing rows are updated after insert (gcs_path after the move,
+-- document status on review): leave page room so the new row version can stay on
+-- the same page, and vacuum the dead versions sooner
+ALTER TABLE document_processing SET (fillfactor = 85, autovacuum_vacuum_scale_factor = 0.05);
+
+-- extracted_entities is insert-only, so it keeps the default fillfactor of 100;
+-- allow parallel scans for reporting queries over the whole table
+ALTER TABLE extracted_entities SET (parallel_workers = 4);
+
+-- Bounding boxes are small float arrays that barely compress: store them uncompressed
+-- when they do go out of line so reads skip pglz decompression
+ALTER TABLE extracted_entities ALTER COLUMN bounding_box SET STORAGE EXTERNAL;
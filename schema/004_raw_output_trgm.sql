@@ -0,0 +1,7 @@
+-- 004: trigram index for substring search over the raw processor output
+
+-- search_in_raw_output filters on raw_processor_output::text ILIKE '%term%'; a trigram
+-- index on that exact expression replaces the sequential scan that casts every document.
+-- (pg_trgm is created in 001_init.sql.) The pending list is enlarged so inserts of large
+-- documents append to it and the trigram entries are merged in bulk rather than per row.
+CREATE INDEX IF NOT EXISTS idx_document_processing_raw_output_trgm ON document_processing USING gin((raw_processor_output::text) gin_trgm_ops) WITH (fastupdate = on, gin_pending_list_limit = 16384);
@@ -0,0 +1,17 @@
+-- 005: widen the per-document entity lookup index and order file name lookups by recency
+
+-- Entity reads filter on processing_id and order by entity_name, confidence_score DESC;
+-- carrying page_number as well lets the document detail read (name, value, confidence,
+-- page) come from the index without a heap fetch per entity. bounding_box is left out:
+-- a JSONB payload in a btree tuple risks the 2704-byte index row limit on insert.
+CREATE INDEX IF NOT EXISTS idx_extracted_entities_lookup_cover ON extracted_entities(processing_id, entity_name, confidence_score DESC) INCLUDE (entity_value, page_number);
+DROP INDEX IF EXISTS idx_extracted_entities_lookup;
+-- The wider index now serves every per-document read, so the page-ordered cover would
+-- only be a second processing_id index for each entity insert to maintain (the page
+-- order read also fetches bounding_box from the heap, and sorts one document's rows)
+DROP INDEX IF EXISTS idx_extracted_entities_doc_page_cover;
+
+-- get_processing_status: latest record for a file name, without a sort
+-- (recency-only scans already use idx_document_processing_created_id)
+CREATE INDEX IF NOT EXISTS idx_document_processing_file_name_created ON document_processing(file_name, created_at DESC);
+DROP INDEX IF EXISTS idx_document_processing_file_name;
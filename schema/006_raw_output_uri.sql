@@ -0,0 +1,7 @@
+-- 006: keep large raw processor outputs in GCS and store only their location
+
+-- Nullable column without a default: a catalog-only change, existing rows are not rewritten
+ALTER TABLE document_processing ADD COLUMN IF NOT EXISTS raw_processor_output_uri TEXT;
+
+COMMENT ON COLUMN document_processing.raw_processor_output_uri IS
+'gs:// location of the raw processor output when it is too large to keep inline (raw_processor_output is then NULL)';
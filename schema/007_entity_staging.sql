@@ -0,0 +1,21 @@
+-- 007: unlogged staging table for bulk entity ingest (DatabaseService.bulk_ingest_entities)
+
+-- Bulk loads COPY into this table without writing WAL, then move rows to extracted_entities
+-- in one set-based INSERT. Only the columns the loader supplies; no id, so staging does not
+-- consume extracted_entities_id_seq. Contents are lost on a crash, which is fine: rows only
+-- live here inside the transaction that moves them.
+CREATE UNLOGGED TABLE IF NOT EXISTS extracted_entities_staging (
+    processing_id INTEGER NOT NULL,
+    entity_name TEXT NOT NULL,
+    entity_value TEXT,
+    confidence_score DECIMAL(3,2),
+    page_number INTEGER,
+    bounding_box JSONB,
+    bbox_xmin DOUBLE PRECISION,
+    bbox_ymin DOUBLE PRECISION,
+    bbox_xmax DOUBLE PRECISION,
+    bbox_ymax DOUBLE PRECISION
+);
+
+-- The move deletes a document's rows by processing_id
+CREATE INDEX IF NOT EXISTS idx_extracted_entities_staging_processing_id ON extracted_entities_staging(processing_id);
@@ -0,0 +1,6 @@
+-- 008: drop the unused gcs_path_hash column and its index
+
+-- No query looks documents up by gcs_path, so the stored md5 and its index only added
+-- work to every insert and path update. Dropping a column is catalog-only (no rewrite).
+DROP INDEX IF EXISTS idx_document_processing_gcs_path_hash;
+ALTER TABLE document_processing DROP COLUMN IF EXISTS gcs_path_hash;
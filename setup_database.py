@@ -1,336 +1,746 @@
 # setup_database.py
-import psycopg2
+from psycopg2 import sql
+from psycopg2.pool import SimpleConnectionPool
+from psycopg2.errors import LockNotAvailable, UndefinedTable
+from psycopg2.extras import execute_values
+import argparse
+import atexit
+import csv
+import io
+import logging
+import orjson
+import re
 import sys
 import os
+import time
+from typing import Optional
 
 # Add config to path
 sys.path.insert(0, os.path.dirname(__file__))
 from config.config import DB_CONFIG
+from src.db_pool import OrJson
 
-def create_tables():
-    """Create database tables and indexes with bounding box support and raw processor output"""
-    
-    # SQL for creating tables
-    create_tables_sql = """
-    -- Create document processing table with raw processor output
-    CREATE TABLE IF NOT EXISTS document_processing (
-        id SERIAL PRIMARY KEY,
-        file_name VARCHAR(255) NOT NULL,
-        gcs_path VARCHAR(500) NOT NULL,
-        processing_status VARCHAR(50) NOT NULL CHECK (processing_status IN ('SUCCESS', 'FAILED', 'PROCESSING')),
-        document_status VARCHAR(50) CHECK (document_status IN ('SUCCESS', 'FAILED', 'PENDING', 'PENDING_REVIEW')),
-        min_confidence DECIMAL(3,2),
-        exception_reason_code VARCHAR(20),
-        exception_reason_description TEXT,
-        exception_entities JSONB,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        error_message TEXT,
-        raw_processor_output JSONB
-    );
+# Quiet by default for unattended runs (CI, container start); SETUP_LOG_LEVEL=INFO or
+# --verbose prints progress and the schema report
+logger = logging.getLogger(__name__)
+logger.setLevel(os.environ.get("SETUP_LOG_LEVEL", "WARNING"))
+
+# Prefix for every setup/migration transaction: setup can simply be rerun after a crash,
+# so commits need not wait for the WAL flush, and JIT compilation is pure overhead for
+# DDL and catalog queries. (commit_delay is superuser-only, so it is left alone.)
+SETUP_TRANSACTION_SETTINGS = "SET LOCAL synchronous_commit = off; SET LOCAL jit = off;"
+
+# Migration DDL gives up quickly instead of queueing behind (and blocking) live traffic,
+# then retries; each attempt holds ACCESS EXCLUSIVE for at most DDL_LOCK_TIMEOUT
+DDL_LOCK_TIMEOUT = '2s'
+DDL_STATEMENT_TIMEOUT = '30s'
+DDL_LOCK_RETRIES = 5
+DDL_RETRY_DELAY_SECONDS = 1.0
+
+# migrate_existing_table reproduces migrations up to this version on a live table
+# (short-lock DDL, concurrent index builds) and records them without running them;
+# later migrations go through apply_migrations
+ONLINE_MIGRATION_VERSION = 6
+
+# Rows per bbox backfill transaction in migrate_existing_table
+BBOX_BACKFILL_BATCH_SIZE = 10000
+
+# Fill bbox_* from normalized_vertices for one batch of rows after id %(last_id)s;
+# SKIP LOCKED steps over rows the processing job is writing. Batches move past the
+# skipped ids, so BBOX_BACKFILL_WAIT_SQL (same query, waiting on locks) makes a final
+# pass over whatever is still NULL. Returns a single (rows updated, last id) row so
+# the batch ids never reach Python.
+BBOX_BACKFILL_SQL = """
+    WITH batch AS (
+        SELECT id FROM extracted_entities
+        WHERE id > %(last_id)s
+        AND bbox_xmin IS NULL
+        AND jsonb_typeof(bounding_box->'normalized_vertices') = 'array'
+        ORDER BY id
+        LIMIT %(batch_size)s
+        FOR UPDATE SKIP LOCKED
+    ), updated AS (
+        UPDATE extracted_entities e
+        SET (bbox_xmin, bbox_ymin, bbox_xmax, bbox_ymax) = (
+            SELECT min((v->>'x')::float8), min((v->>'y')::float8),
+                   max((v->>'x')::float8), max((v->>'y')::float8)
+            FROM jsonb_array_elements(e.bounding_box->'normalized_vertices') v
+        )
+        FROM batch
+        WHERE e.id = batch.id
+        RETURNING e.id
+    )
+    SELECT count(*), max(id) FROM updated
+"""
+BBOX_BACKFILL_WAIT_SQL = BBOX_BACKFILL_SQL.replace(" SKIP LOCKED", "")
+
+# bulk_insert_entities switches from multi-row INSERT to COPY above this many rows
+COPY_THRESHOLD_ROWS = 100000
+
+# Insert entity rows from a source relation, deriving bbox_* from normalized_vertices;
+# {source} must expose the six ENTITY_LOAD_COLUMNS as s.*
+ENTITY_LOAD_COLUMNS = "processing_id, entity_name, entity_value, confidence_score, page_number, bounding_box"
+ENTITY_LOAD_SQL = """
+    INSERT INTO extracted_entities
+    (processing_id, entity_name, entity_value, confidence_score, page_number, bounding_box,
+     bbox_xmin, bbox_ymin, bbox_xmax, bbox_ymax)
+    SELECT s.processing_id, s.entity_name, s.entity_value, s.confidence_score, s.page_number,
+           s.bounding_box, extent.xmin, extent.ymin, extent.xmax, extent.ymax
+    FROM {source}
+    CROSS JOIN LATERAL (
+        SELECT min((v->>'x')::float8) AS xmin, min((v->>'y')::float8) AS ymin,
+               max((v->>'x')::float8) AS xmax, max((v->>'y')::float8) AS ymax
+        FROM jsonb_array_elements(s.bounding_box->'normalized_vertices') v
+    ) extent
+"""
+ENTITY_VALUES_TEMPLATE = "(%s::integer, %s, %s, %s::decimal, %s::integer, %s::jsonb)"
+
+# Optional DSN (e.g. a pgbouncer endpoint) used instead of DB_CONFIG when set
+PGBOUNCER_URL = os.getenv('PGBOUNCER_URL')
+
+# One pool for the whole script so every step reuses the same backend connection
+_pool = None
+
+def _get_pool() -> SimpleConnectionPool:
+    """Return the script's connection pool, connecting on first use"""
+    global _pool
+    if _pool is None:
+        if PGBOUNCER_URL:
+            _pool = SimpleConnectionPool(1, 2, dsn=PGBOUNCER_URL)
+        else:
+            _pool = SimpleConnectionPool(1, 2, **DB_CONFIG)
+        atexit.register(_pool.closeall)
+    return _pool
+
+def _getconn():
+    """Borrow a connection from the pool"""
+    return _get_pool().getconn()
+
+def _putconn(conn):
+    """Return a borrowed connection (open transactions are rolled back)"""
+    _get_pool().putconn(conn)
 
-    -- Create entities table with bounding box support
-    CREATE TABLE IF NOT EXISTS extracted_entities (
-        id SERIAL PRIMARY KEY,
-        processing_id INTEGER REFERENCES document_processing(id) ON DELETE CASCADE,
-        entity_name VARCHAR(50) NOT NULL,
-        entity_value TEXT,
-        confidence_score DECIMAL(3,2),
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        page_number INTEGER,
-        bounding_box JSONB
+# Versioned DDL lives in schema/NNN_description.sql; applied versions are
+# recorded in schema_migrations
+SCHEMA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schema')
+MIGRATION_FILE_PATTERN = re.compile(r'^(\d+)_[\w-]+\.sql$')
+SCHEMA_MIGRATIONS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
     );
+"""
+SCHEMA_VERSION_SQL = "SELECT COALESCE(MAX(version), 0) FROM schema_migrations;"
+
+# Tables covered by the schema report
+SCHEMA_TABLES = ('document_processing', 'extracted_entities')
+
+# Introspection queries take table/column names as parameters rather than baked-in text
+TABLE_COLUMNS_SQL = """
+    SELECT column_name, data_type, is_nullable
+    FROM information_schema.columns 
+    WHERE table_name = %s
+    ORDER BY ordinal_position
+"""
+COLUMN_TYPE_SQL = """
+    SELECT data_type FROM information_schema.columns
+    WHERE table_name = %s AND column_name = %s
+"""
+
+# Row counts for the report come from the planner's pg_class.reltuples estimate (a catalog
+# lookup; -1 until the table is first analyzed). --exact swaps in COUNT(*) sequential scans.
+ROW_COUNT_ESTIMATE_SQL = sql.SQL("""
+        'row_counts', (
+            SELECT json_object_agg(relname, GREATEST(reltuples, 0)::bigint)
+            FROM pg_class
+            WHERE oid IN ({regclasses})
+        )
+""").format(
+    regclasses=sql.SQL(', ').join(
+        sql.SQL('to_regclass({})').format(sql.Literal(f'public.{table}')) for table in SCHEMA_TABLES
+    )
+)
+ROW_COUNT_EXACT_SQL = sql.SQL("""
+        'row_counts', json_build_object({counts})
+""").format(
+    counts=sql.SQL(', ').join(
+        sql.SQL('{}, (SELECT COUNT(*) FROM {})').format(sql.Literal(table), sql.Identifier(table))
+        for table in SCHEMA_TABLES
+    )
+)
 
-    COMMENT ON COLUMN document_processing.processing_status IS 
-    'Document AI processing status: SUCCESS (AI processed successfully), FAILED (AI processing failed due to network/service issues), PROCESSING (currently being processed)';
+# One round trip for the post-setup report: tables, columns, comments, indexes and row counts
+SCHEMA_REPORT_SQL = sql.SQL("""
+    SELECT json_build_object(
+        'tables', (
+            SELECT json_agg(c.relname ORDER BY c.relname)
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = 'public' AND c.relkind IN ('r', 'p')
+        ),
+        'columns', (
+            SELECT json_agg(json_build_array(table_name, column_name, data_type, is_nullable)
+                            ORDER BY table_name, ordinal_position)
+            FROM information_schema.columns
+            WHERE table_name IN ({tables})
+        ),
+        'comments', (
+            SELECT json_agg(json_build_array(table_name, column_name, comment)
+                            ORDER BY table_name, ordinal_position)
+            FROM (
+                SELECT cols.table_name, cols.column_name, cols.ordinal_position,
+                       pg_catalog.col_description(quote_ident(cols.table_name)::regclass,
+                                                  cols.ordinal_position::int) AS comment
+                FROM information_schema.columns cols
+                WHERE cols.table_schema = 'public'
+                AND cols.table_name IN ({tables})
+            ) described
+            WHERE comment IS NOT NULL
+        ),
+        'indexes', (
+            SELECT json_agg(json_build_array(tablename, indexname) ORDER BY tablename, indexname)
+            FROM pg_indexes
+            WHERE tablename IN ({tables})
+            AND indexname LIKE 'idx_%'
+        ),
+        {row_counts}
+    )
+""")
+SCHEMA_TABLES_LITERAL = sql.SQL(', ').join(map(sql.Literal, SCHEMA_TABLES))
+
+def bulk_insert_entities(conn, rows) -> int:
+    """
+    Insert extracted_entities rows in bulk (seed data and reloads)
     
-    COMMENT ON COLUMN document_processing.document_status IS 
-    'Document extraction validation status: SUCCESS (all entities extracted with confidence above threshold), FAILED (missing entities), PENDING (not yet validated), PENDING_REVIEW (all entities present but min confidence below threshold)';
+    Uses a multi-row INSERT via execute_values, or COPY through a temp table for
+    loads over COPY_THRESHOLD_ROWS. The caller commits.
     
-    COMMENT ON COLUMN document_processing.min_confidence IS 
-    'Minimum confidence score among all extracted entities (0.00-1.00). Used to determine if document needs review.';
+    Args:
+        conn: Open database connection
+        rows: Sequence of (processing_id, entity_name, entity_value, confidence_score,
+            page_number, bounding_box) tuples; bounding_box is a dict, JSON string or None
+        
+    Returns:
+        Number of rows inserted
+    """
+    if not rows:
+        return 0
     
-    COMMENT ON COLUMN document_processing.exception_reason_code IS 
-    'Exception code for validation failures: MISSING_ENTITIES, LOW_CONFIDENCE, PROCESSING_ERROR, etc.';
+    with conn.cursor() as cursor:
+        if len(rows) <= COPY_THRESHOLD_ROWS:
+            source = f"(VALUES %s) AS s({ENTITY_LOAD_COLUMNS})"
+            execute_values(
+                cursor,
+                ENTITY_LOAD_SQL.format(source=source),
+                [(*row[:5], OrJson(row[5]) if isinstance(row[5], dict) else row[5]) for row in rows],
+                template=ENTITY_VALUES_TEMPLATE,
+                page_size=1000
+            )
+        else:
+            # Stage as CSV (\N for NULL so empty strings survive), then insert with extents
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            for row in rows:
+                bounding_box = orjson.dumps(row[5]).decode() if isinstance(row[5], dict) else row[5]
+                writer.writerow(['\\N' if value is None else value for value in (*row[:5], bounding_box)])
+            buf.seek(0)
+            cursor.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS entity_load (
+                    processing_id INTEGER, entity_name TEXT, entity_value TEXT,
+                    confidence_score DECIMAL(3,2), page_number INTEGER, bounding_box JSONB
+                ) ON COMMIT DROP;
+                TRUNCATE entity_load;
+            """)
+            cursor.copy_expert(
+                f"COPY entity_load ({ENTITY_LOAD_COLUMNS}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                buf
+            )
+            cursor.execute(ENTITY_LOAD_SQL.format(source="entity_load s"))
+    return len(rows)
+
+def print_schema_report(cursor, exact: bool = False):
+    """Fetch and log the schema report for both tables (exact=True counts rows with COUNT(*))"""
+    cursor.execute(SCHEMA_REPORT_SQL.format(
+        tables=SCHEMA_TABLES_LITERAL,
+        row_counts=ROW_COUNT_EXACT_SQL if exact else ROW_COUNT_ESTIMATE_SQL
+    ))
+    report = cursor.fetchone()[0]
+    logger.info(f"✅ Tables created: {report['tables'] or []}")
     
-    COMMENT ON COLUMN document_processing.exception_reason_description IS 
-    'Detailed description of validation failures including specific missing entities or low confidence fields';
+    # Display document_processing schema
+    logger.info("\n📋 document_processing table schema (Updated v1.1.0):")
+    columns = report['columns'] or []
+    for table, column, data_type, nullable in columns:
+        if table == 'document_processing':
+            marker = "🆕" if column == 'raw_processor_output' else "  "
+            logger.info(f"   {marker} {column}: {data_type} (nullable: {nullable})")
+
+    # Display extracted_entities schema
+    logger.info("\n📋 extracted_entities table schema:")
+    for table, column, data_type, nullable in columns:
+        if table == 'extracted_entities':
+            logger.info(f"   • {column}: {data_type} (nullable: {nullable})")
     
-    COMMENT ON COLUMN document_processing.exception_entities IS 
-    'JSON object containing details of entities that caused exceptions: {"missing": [], "low_confidence": [{"name": "...", "confidence": 0.xx}]}';
+    # Record counts
+    row_counts = report['row_counts'] or {}
+    approx = "" if exact else "~"
+    logger.info(f"\n✅ Document processing records: {approx}{row_counts.get('document_processing', 0)}")
+    logger.info(f"✅ Extracted entities records: {approx}{row_counts.get('extracted_entities', 0)}")
     
-    COMMENT ON COLUMN extracted_entities.bounding_box IS 
-    'Bounding box coordinates in format: {"vertices": [{"x": float, "y": float}, ...], "normalized_vertices": [{"x": float, "y": float}, ...]}';
+    # Display column comments  
+    logger.info("\n📝 Column comments:")
+    for table, column, comment in report['comments'] or []:
+        logger.info(f"   • {table}.{column}: {comment}")
     
-    COMMENT ON COLUMN document_processing.raw_processor_output IS 
-    'Complete raw output from Document AI processor in JSON format for future analysis and reprocessing';
-
-    -- Create indexes for performance
-    CREATE INDEX IF NOT EXISTS idx_document_processing_status ON document_processing(processing_status);
-    CREATE INDEX IF NOT EXISTS idx_document_processing_document_status ON document_processing(document_status);
-    CREATE INDEX IF NOT EXISTS idx_document_processing_exception_code ON document_processing(exception_reason_code);
-    CREATE INDEX IF NOT EXISTS idx_document_processing_min_confidence ON document_processing(min_confidence);
-    CREATE INDEX IF NOT EXISTS idx_extracted_entities_processing_id ON extracted_entities(processing_id);
-    CREATE INDEX IF NOT EXISTS idx_extracted_entities_name ON extracted_entities(entity_name);
-    CREATE INDEX IF NOT EXISTS idx_extracted_entities_page_number ON extracted_entities(page_number);
+    # Display performance indexes
+    logger.info("\n🚀 Performance indexes created:")
+    for table, index in report['indexes'] or []:
+        marker = "🆕" if 'gin' in index or 'file_name' in index or 'status_created' in index or 'gcs_path' in index else "  "
+        logger.info(f"   {marker} {table}: {index}")
+
+def _migration_files():
+    """(version, path) for every schema/NNN_*.sql file, in version order"""
+    migrations = []
+    for name in os.listdir(SCHEMA_DIR):
+        match = MIGRATION_FILE_PATTERN.match(name)
+        if match:
+            migrations.append((int(match.group(1)), os.path.join(SCHEMA_DIR, name)))
+    return sorted(migrations)
+
+def latest_schema_version() -> int:
+    """Highest migration version checked in under schema/"""
+    migrations = _migration_files()
+    return migrations[-1][0] if migrations else 0
+
+def _schema_version(conn) -> int:
+    """Highest applied migration version (0 before the first migration)"""
+    with conn.cursor() as cursor:
+        try:
+            cursor.execute(SCHEMA_VERSION_SQL)
+            version = cursor.fetchone()[0]
+        except UndefinedTable:
+            version = 0
+    conn.rollback()
+    return version
+
+def _schema_version_matches(conn, version: int) -> bool:
+    """True when the database is already at (or past) the given migration version"""
+    return _schema_version(conn) >= version
+
+def apply_migrations(conn) -> int:
+    """
+    Apply every schema/NNN_*.sql migration newer than the recorded version
     
-    -- Performance indexes for new schema
-    CREATE INDEX IF NOT EXISTS idx_document_processing_file_name ON document_processing(file_name);
-    CREATE INDEX IF NOT EXISTS idx_document_processing_status_created ON document_processing(processing_status, created_at DESC);
-    CREATE INDEX IF NOT EXISTS idx_document_processing_gcs_path ON document_processing USING hash(gcs_path);
+    Each file runs in its own transaction together with its schema_migrations row,
+    after SETUP_TRANSACTION_SETTINGS; migration files carry only their DDL.
     
-    -- GIN index for JSONB columns for efficient searching
-    CREATE INDEX IF NOT EXISTS idx_extracted_entities_bounding_box_gin ON extracted_entities USING gin(bounding_box);
-    CREATE INDEX IF NOT EXISTS idx_document_processing_raw_output_gin ON document_processing USING gin(raw_processor_output);
-    CREATE INDEX IF NOT EXISTS idx_document_processing_exception_entities_gin ON document_processing USING gin(exception_entities);
+    Args:
+        conn: Database connection
+        
+    Returns:
+        Number of migrations applied
+    """
+    current = _schema_version(conn)
+    applied = 0
+    with conn.cursor() as cursor:
+        cursor.execute(SCHEMA_MIGRATIONS_TABLE_SQL)
+        conn.commit()
+        for version, path in _migration_files():
+            if version <= current:
+                continue
+            with open(path) as migration:
+                cursor.execute(SETUP_TRANSACTION_SETTINGS + migration.read())
+            cursor.execute("INSERT INTO schema_migrations (version) VALUES (%s);", (version,))
+            conn.commit()
+            logger.info(f"📦 Applied migration {os.path.basename(path)}")
+            applied += 1
+    return applied
+
+def _record_migrations(conn, through_version: int):
+    """Mark every migration up to through_version as applied without running it"""
+    versions = [version for version, _ in _migration_files() if version <= through_version]
+    with conn.cursor() as cursor:
+        cursor.execute(SCHEMA_MIGRATIONS_TABLE_SQL)
+        cursor.execute(
+            "INSERT INTO schema_migrations (version) SELECT unnest(%s::integer[]) ON CONFLICT DO NOTHING;",
+            (versions,)
+        )
+    conn.commit()
+
+def create_tables(verbose: Optional[bool] = None, conn=None, exact: bool = False):
+    """
+    Create database tables and indexes with bounding box support and raw processor output
+    by applying pending schema/ migrations (a no-op when the schema is current)
+    
+    Args:
+        verbose: Log the resulting schema, comments, indexes and row counts
+            (default: when INFO logging is enabled)
+        conn: Connection to run on; borrowed from the pool when omitted
+        exact: Report exact row counts (full scans) instead of planner estimates
     """
     
     # SQL for test data
     test_data_sql = """
-    -- Insert test record with sample raw processor output (only if table is empty)
+    -- Partial unique index so the seed row can be inserted idempotently
+    CREATE UNIQUE INDEX IF NOT EXISTS uq_document_processing_test ON document_processing(file_name) WHERE file_name = 'test_invoice.pdf';
+
+    -- Insert test record with sample raw processor output (skipped if it already exists)
     INSERT INTO document_processing (file_name, gcs_path, processing_status, document_status, min_confidence, raw_processor_output)
-    SELECT 
+    VALUES (
         'test_invoice.pdf', 
         'gs://sample_invoice_bucket_coe/input/test_invoice.pdf', 
         'SUCCESS',
         'PENDING',
         0.85,
         '{"test_data": true, "entities_count": 0, "mock_document": {"text": "Sample invoice document", "pages": [{"page_number": 0}]}}'::jsonb
-    WHERE NOT EXISTS (SELECT 1 FROM document_processing WHERE file_name = 'test_invoice.pdf');
+    )
+    ON CONFLICT (file_name) WHERE file_name = 'test_invoice.pdf' DO NOTHING;
     """
     
+    owns_conn = conn is None
     try:
-        # Connect to database
-        conn = psycopg2.connect(**DB_CONFIG)
+        if owns_conn:
+            conn = _getconn()
         cursor = conn.cursor()
         
-        print("🔗 Connected to database successfully!")
-        
-        # Create tables
-        print("📋 Creating tables...")
-        cursor.execute(create_tables_sql)
+        # Steady state is one SELECT: migrations and the seed only run when behind
+        if not _schema_version_matches(conn, latest_schema_version()):
+            logger.info("📋 Creating tables and inserting test data...")
+            apply_migrations(conn)
+            cursor.execute(SETUP_TRANSACTION_SETTINGS + test_data_sql)
+            conn.commit()
         
-        # Insert test data
-        print("📝 Inserting test data...")
-        cursor.execute(test_data_sql)
-        
-        # Commit changes
-        conn.commit()
-        
-        # Verify tables were created
-        cursor.execute("""
-            SELECT table_name FROM information_schema.tables 
-            WHERE table_schema = 'public' AND table_type = 'BASE TABLE';
-        """)
-        tables = cursor.fetchall()
-        print(f"✅ Tables created: {[table[0] for table in tables]}")
-        
-        # Display document_processing schema
-        print("\n📋 document_processing table schema (Updated v1.1.0):")
-        cursor.execute("""
-            SELECT column_name, data_type, is_nullable
-            FROM information_schema.columns 
-            WHERE table_name = 'document_processing'
-            ORDER BY ordinal_position
-        """)
-        columns = cursor.fetchall()
-        for col in columns:
-            marker = "🆕" if col[0] == 'raw_processor_output' else "  "
-            print(f"   {marker} {col[0]}: {col[1]} (nullable: {col[2]})")
-
-        # Display extracted_entities schema
-        print("\n📋 extracted_entities table schema:")
-        cursor.execute("""
-            SELECT column_name, data_type, is_nullable
-            FROM information_schema.columns 
-            WHERE table_name = 'extracted_entities'
-            ORDER BY ordinal_position
-        """)
-        columns = cursor.fetchall()
-        for col in columns:
-            print(f"   • {col[0]}: {col[1]} (nullable: {col[2]})")
-        
-        # Check record count
-        cursor.execute("SELECT COUNT(*) FROM document_processing;")
-        count = cursor.fetchone()[0]
-        print(f"\n✅ Document processing records: {count}")
-        
-        cursor.execute("SELECT COUNT(*) FROM extracted_entities;")
-        count = cursor.fetchone()[0]
-        print(f"✅ Extracted entities records: {count}")
-        
-        # Display column comments  
-        print("\n📝 Column comments:")
-        cursor.execute("""
-            SELECT 
-                t.table_name,
-                cols.column_name,
-                pg_catalog.col_description(c.oid, cols.ordinal_position::int)
-            FROM information_schema.columns cols
-            JOIN pg_catalog.pg_class c ON c.relname = cols.table_name
-            JOIN information_schema.tables t ON t.table_name = cols.table_name
-            WHERE t.table_name IN ('document_processing', 'extracted_entities')
-            AND pg_catalog.col_description(c.oid, cols.ordinal_position::int) IS NOT NULL
-            ORDER BY t.table_name, cols.ordinal_position
-        """)
-        comments = cursor.fetchall()
-        for comment in comments:
-            print(f"   • {comment[0]}.{comment[1]}: {comment[2]}")
-        
-        # Display performance indexes
-        print("\n🚀 Performance indexes created:")
-        cursor.execute("""
-            SELECT indexname, tablename 
-            FROM pg_indexes 
-            WHERE tablename IN ('document_processing', 'extracted_entities')
-            AND indexname LIKE 'idx_%'
-            ORDER BY tablename, indexname
-        """)
-        indexes = cursor.fetchall()
-        for idx in indexes:
-            marker = "🆕" if 'gin' in idx[0] or 'file_name' in idx[0] or 'status_created' in idx[0] or 'gcs_path' in idx[0] else "  "
-            print(f"   {marker} {idx[1]}: {idx[0]}")
+        if verbose if verbose is not None else logger.isEnabledFor(logging.INFO):
+            print_schema_report(cursor, exact=exact)
         
         cursor.close()
-        conn.close()
         
-        print("\n✅ Database setup completed successfully!")
-        print("✅ New Features:")
-        print("   🆕 Raw processor output storage (JSONB)")
-        print("   🚀 Performance indexes for faster queries")
-        print("   🔍 JSONB search capabilities") 
-        print("   📦 Bounding box support")
-        print("   🆕 Document status validation (separate from processing status)")
-        print("   🆕 Exception reason codes and descriptions")
-        print("   🆕 Exception entities tracking (which specific entities failed)")
-        print("   🆕 Minimum confidence tracking for review workflow")
-        print("   🆕 PENDING_REVIEW status for low confidence documents")
-        print("   ❌ Removed: extraction_confidence (use entity-level confidence instead)")
+        logger.info("\n✅ Database setup completed successfully!")
+        logger.info("✅ New Features:")
+        logger.info("   🆕 Raw processor output storage (JSONB)")
+        logger.info("   🚀 Performance indexes for faster queries")
+        logger.info("   🔍 JSONB search capabilities") 
+        logger.info("   📦 Bounding box support")
+        logger.info("   🆕 Document status validation (separate from processing status)")
+        logger.info("   🆕 Exception reason codes and descriptions")
+        logger.info("   🆕 Exception entities tracking (which specific entities failed)")
+        logger.info("   🆕 Minimum confidence tracking for review workflow")
+        logger.info("   🆕 PENDING_REVIEW status for low confidence documents")
+        logger.info("   ❌ Removed: extraction_confidence (use entity-level confidence instead)")
         return True
         
     except Exception as e:
-        print(f"❌ Database setup failed: {e}")
+        logger.error(f"❌ Database setup failed: {e}")
         return False
+    finally:
+        if conn:
+            _discard_session_state(conn)
+        if owns_conn and conn:
+            _putconn(conn)
+
+def _discard_session_state(conn):
+    """
+    Return a connection to a clean session after running DDL on it
+    
+    Cached plans and prepared statements created before a schema change go stale
+    (asyncpg raises InvalidCachedStatementError on their next use), so DISCARD ALL
+    drops them before the connection is reused. Also restores autocommit off.
+    """
+    if conn.closed:
+        return
+    conn.rollback()
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        cursor.execute("DISCARD ALL;")
+    conn.autocommit = False
 
-def migrate_existing_table():
-    """Add bounding box columns to existing extracted_entities table"""
+def _run_short_ddl(conn, statement: str, statement_timeout: str = DDL_STATEMENT_TIMEOUT):
+    """
+    Run one DDL statement in its own transaction under bounded lock/statement timeouts
+    
+    Args:
+        conn: Database connection
+        statement: DDL to run
+        statement_timeout: Server statement_timeout for the statement ('0' disables it,
+            for rewrites that must run to completion once they hold the lock)
+    """
+    for attempt in range(1, DDL_LOCK_RETRIES + 1):
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    f"SET LOCAL lock_timeout = '{DDL_LOCK_TIMEOUT}'; "
+                    f"SET LOCAL statement_timeout = '{statement_timeout}'; "
+                    + SETUP_TRANSACTION_SETTINGS
+                )
+                cursor.execute(statement)
+            conn.commit()
+            return
+        except LockNotAvailable:
+            conn.rollback()
+            if attempt == DDL_LOCK_RETRIES:
+                raise
+            logger.warning(f"⏳ Table busy, retrying DDL ({attempt}/{DDL_LOCK_RETRIES})...")
+            time.sleep(DDL_RETRY_DELAY_SECONDS * attempt)
+
+def migrate_existing_table(conn=None):
+    """
+    Add bounding box columns to existing extracted_entities table
+    
+    Args:
+        conn: Connection to run on; borrowed from the pool when omitted
+    """
+    owns_conn = conn is None
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
+        if owns_conn:
+            conn = _getconn()
         cursor = conn.cursor()
         
-        print("🔧 Migrating existing table to add bounding box support...")
+        logger.info("🔧 Migrating existing table to add bounding box support...")
         
-        # Add new columns if they don't exist
-        cursor.execute("""
+        # Add new columns if they don't exist; nullable columns without defaults are
+        # metadata-only, so each short transaction holds its lock only briefly
+        _run_short_ddl(conn, "ALTER TABLE extracted_entities ADD COLUMN IF NOT EXISTS page_number INTEGER;")
+        _run_short_ddl(conn, "ALTER TABLE extracted_entities ADD COLUMN IF NOT EXISTS bounding_box JSONB;")
+        _run_short_ddl(conn, """
             ALTER TABLE extracted_entities 
-            ADD COLUMN IF NOT EXISTS page_number INTEGER,
-            ADD COLUMN IF NOT EXISTS bounding_box JSONB;
+            ADD COLUMN IF NOT EXISTS bbox_xmin DOUBLE PRECISION,
+            ADD COLUMN IF NOT EXISTS bbox_ymin DOUBLE PRECISION,
+            ADD COLUMN IF NOT EXISTS bbox_xmax DOUBLE PRECISION,
+            ADD COLUMN IF NOT EXISTS bbox_ymax DOUBLE PRECISION;
+        """)
+        
+        # VARCHAR(n) -> TEXT is binary-compatible: no table rewrite, only the length
+        # check goes away
+        _run_short_ddl(conn, """
+            ALTER TABLE document_processing
+            ALTER COLUMN file_name TYPE TEXT,
+            ALTER COLUMN gcs_path TYPE TEXT,
+            ALTER COLUMN document_status TYPE TEXT,
+            ALTER COLUMN exception_reason_code TYPE TEXT;
+        """)
+        _run_short_ddl(conn, "ALTER TABLE extracted_entities ALTER COLUMN entity_name TYPE TEXT;")
+        
+        # processing_status moves from a CHECKed string to the enum. This is the one
+        # blocking step: the type change rewrites the table and its indexes under ACCESS
+        # EXCLUSIVE, so it runs without a statement timeout (a cancelled rewrite would only
+        # have to start over) and only while the column is still a string. The lock wait
+        # itself stays bounded and retried like the other DDL.
+        cursor.execute(COLUMN_TYPE_SQL, ('document_processing', 'processing_status'))
+        if cursor.fetchone()[0] != 'USER-DEFINED':
+            _run_short_ddl(conn, """
+                DO $$ BEGIN
+                    CREATE TYPE processing_status_t AS ENUM ('FAILED', 'PROCESSING', 'SUCCESS');
+                EXCEPTION WHEN duplicate_object THEN NULL;
+                END $$;
+            """)
+            logger.warning("🔒 Converting document_processing.processing_status to an enum; "
+                           "the table is locked for reads and writes until the rewrite finishes...")
+            started = time.monotonic()
+            _run_short_ddl(conn, """
+                ALTER TABLE document_processing
+                DROP CONSTRAINT IF EXISTS document_processing_processing_status_check,
+                ALTER COLUMN processing_status TYPE processing_status_t
+                USING processing_status::processing_status_t;
+            """, statement_timeout='0')
+            logger.warning(f"🔓 processing_status converted in {time.monotonic() - started:.1f}s")
+        conn.commit()
+        
+        # Storage parameters and the raw output location column (001, 003, 006) only
+        # touch the catalog; existing rows are not rewritten
+        _run_short_ddl(conn, """
+            ALTER TABLE document_processing
+            ALTER COLUMN raw_processor_output SET STORAGE EXTENDED,
+            SET (toast_tuple_target = 128, fillfactor = 85, autovacuum_vacuum_scale_factor = 0.05);
+        """)
+        _run_short_ddl(conn, """
+            ALTER TABLE extracted_entities
+            ALTER COLUMN bounding_box SET STORAGE EXTERNAL,
+            SET (autovacuum_vacuum_scale_factor = 0.05, parallel_workers = 4);
         """)
+        _run_short_ddl(conn, "ALTER TABLE document_processing ADD COLUMN IF NOT EXISTS raw_processor_output_uri TEXT;")
         
-        # Add column comment
-        cursor.execute("""
+        # Add column comments
+        _run_short_ddl(conn, """
             COMMENT ON COLUMN extracted_entities.bounding_box IS 
             'Bounding box coordinates in format: {"vertices": [{"x": float, "y": float}, ...], "normalized_vertices": [{"x": float, "y": float}, ...]}';
+            COMMENT ON COLUMN extracted_entities.bbox_xmin IS
+            'Extent of normalized_vertices (0-1 scale) as plain columns for indexed page/region queries; bounding_box is kept for audit';
+            COMMENT ON COLUMN document_processing.raw_processor_output_uri IS
+            'gs:// location of the raw processor output when it is too large to keep inline (raw_processor_output is then NULL)';
         """)
         
-        # Add index for page_number
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_extracted_entities_page_number 
-            ON extracted_entities(page_number);
-        """)
+        # Backfill bbox_* in short transactions so row locks are held briefly: first
+        # skipping rows locked by live writes, then once more waiting for those rows
+        backfilled = 0
+        for backfill_sql in (BBOX_BACKFILL_SQL, BBOX_BACKFILL_WAIT_SQL):
+            last_id = 0
+            while True:
+                cursor.execute(
+                    SETUP_TRANSACTION_SETTINGS + backfill_sql,
+                    {'last_id': last_id, 'batch_size': BBOX_BACKFILL_BATCH_SIZE}
+                )
+                batch_rows, batch_last_id = cursor.fetchone()
+                conn.commit()
+                if not batch_rows:
+                    break
+                last_id = batch_last_id
+                backfilled += batch_rows
+        logger.info(f"📦 Backfilled bounding box extents for {backfilled} entities")
         
-        conn.commit()
+        # Build and drop indexes without blocking writers
+        # (CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction block);
+        # these are the indexes of migrations 001-005, the bbox one after the backfill
+        conn.autocommit = True
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+        for index_sql in (
+            "idx_document_processing_status_active ON document_processing(processing_status, created_at) WHERE processing_status IN ('PROCESSING', 'FAILED')",
+            "idx_document_processing_document_status ON document_processing(document_status)",
+            "idx_document_processing_exception_code ON document_processing(exception_reason_code)",
+            "idx_document_processing_min_confidence ON document_processing(min_confidence)",
+            "idx_document_processing_status_created ON document_processing(processing_status, created_at DESC)",
+            "idx_document_processing_created_id ON document_processing(created_at DESC, id DESC)",
+            "idx_document_processing_file_name_created ON document_processing(file_name, created_at DESC)",
+            "idx_document_processing_file_name_trgm ON document_processing USING gin(file_name gin_trgm_ops)",
+            "idx_document_processing_raw_output_trgm ON document_processing USING gin((raw_processor_output::text) gin_trgm_ops) WITH (fastupdate = on, gin_pending_list_limit = 16384)",
+            "idx_document_processing_exception_entities_gin ON document_processing USING gin(exception_entities)",
+            "idx_extracted_entities_name ON extracted_entities(entity_name)",
+            "idx_extracted_entities_lookup_cover ON extracted_entities(processing_id, entity_name, confidence_score DESC) INCLUDE (entity_value, page_number)",
+            "idx_extracted_entities_value_trgm ON extracted_entities USING gin(entity_value gin_trgm_ops) WHERE entity_name IN ('po_number', 'vendor_name')",
+            "idx_extracted_entities_bbox ON extracted_entities(page_number, bbox_xmin, bbox_ymin, bbox_xmax, bbox_ymax)",
+        ):
+            cursor.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_sql};")
+        
+        # Drop the unused raw output and bounding box GIN indexes, the gcs_path hash
+        # index (nothing looks documents up by path), the full status
+        # index (replaced by idx_document_processing_status_active) and the single-column
+        # entity indexes (covered by idx_extracted_entities_lookup_cover / _bbox), the
+        # lookup and file name indexes (widened by the _lookup_cover / _file_name_created ones)
+        # and the page-ordered entity cover (duplicates _lookup_cover for per-document reads)
+        cursor.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_document_processing_raw_output_gin;")
+        cursor.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_extracted_entities_bounding_box_gin;")
+        cursor.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_document_processing_gcs_path;")
+        cursor.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_document_processing_status;")
+        cursor.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_extracted_entities_processing_id;")
+        cursor.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_extracted_entities_page_number;")
+        cursor.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_extracted_entities_lookup;")
+        cursor.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_document_processing_file_name;")
+        cursor.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_extracted_entities_doc_page_cover;")
+        conn.autocommit = False
         
-        print("✅ Migration completed successfully!")
+        # The table now matches migrations up to ONLINE_MIGRATION_VERSION: record them
+        # without running their blocking DDL, then apply only the newer ones
+        _record_migrations(conn, ONLINE_MIGRATION_VERSION)
+        apply_migrations(conn)
+        
+        logger.info("✅ Migration completed successfully!")
         
         # Display updated schema
-        print("\n📋 Updated schema:")
-        cursor.execute("""
-            SELECT column_name, data_type, is_nullable
-            FROM information_schema.columns 
-            WHERE table_name = 'extracted_entities'
-            ORDER BY ordinal_position
-        """)
-        columns = cursor.fetchall()
-        for col in columns:
-            print(f"   • {col[0]}: {col[1]} (nullable: {col[2]})")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("\n📋 Updated schema:")
+            cursor.execute(TABLE_COLUMNS_SQL, ('extracted_entities',))
+            for col in cursor:
+                logger.info(f"   • {col[0]}: {col[1]} (nullable: {col[2]})")
         
         cursor.close()
-        conn.close()
         return True
         
     except Exception as e:
-        print(f"❌ Migration failed: {e}")
+        logger.error(f"❌ Migration failed: {e}")
         return False
+    finally:
+        if conn:
+            _discard_session_state(conn)
+        if owns_conn and conn:
+            _putconn(conn)
 
 def test_connection():
     """Test database connection"""
+    conn = None
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cursor = conn.cursor()
-        cursor.execute("SELECT version();")
-        version = cursor.fetchone()
-        print(f"✅ Database connection successful!")
-        print(f"PostgreSQL version: {version[0][:50]}...")
-        cursor.close()
-        conn.close()
+        conn = _getconn()
+        # server_version is reported in the startup handshake; no query needed
+        logger.info(f"✅ Database connection successful!")
+        logger.info(f"PostgreSQL server version: {conn.server_version}")
         return True
     except Exception as e:
-        print(f"❌ Connection failed: {e}")
+        logger.error(f"❌ Connection failed: {e}")
         return False
+    finally:
+        if conn:
+            _putconn(conn)
 
-def check_table_exists():
-    """Check if tables already exist"""
+def check_table_exists(conn=None):
+    """
+    Check if tables already exist
+    
+    Args:
+        conn: Connection to run on; borrowed from the pool when omitted
+    """
+    owns_conn = conn is None
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
+        if owns_conn:
+            conn = _getconn()
         cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT EXISTS (
-                SELECT FROM information_schema.tables 
-                WHERE table_name = 'extracted_entities'
-            );
-        """)
+        # Catalog lookup only; no information_schema view expansion
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL;", ('public.extracted_entities',))
         exists = cursor.fetchone()[0]
         
         cursor.close()
-        conn.close()
         return exists
         
     except Exception as e:
-        print(f"❌ Error checking tables: {e}")
+        logger.error(f"❌ Error checking tables: {e}")
         return False
+    finally:
+        if owns_conn and conn:
+            _putconn(conn)
 
 if __name__ == "__main__":
-    print("🚀 Starting database setup...")
-    print("=" * 80)
+    parser = argparse.ArgumentParser(description="Create or migrate the invoice processing schema")
+    parser.add_argument("--verbose", action="store_true", help="Log progress and the resulting schema")
+    parser.add_argument("--exact", action="store_true", help="Report exact row counts instead of estimates")
+    args = parser.parse_args()
+    logging.basicConfig(format="%(message)s", stream=sys.stdout)
+    if args.verbose:
+        logger.setLevel(logging.INFO)
     
-    # Test connection first
-    if not test_connection():
-        sys.exit(1)
+    logger.info("🚀 Starting database setup...")
+    logger.info("=" * 80)
     
-    print("\n" + "=" * 80)
+    # One connection for the whole run; a failed connect is the connection test
+    try:
+        conn = _getconn()
+    except Exception as e:
+        logger.error(f"❌ Connection failed: {e}")
+        sys.exit(1)
+    logger.info("🔗 Connected to database successfully!")
     
-    # Check if table already exists
-    table_exists = check_table_exists()
+    logger.info("\n" + "=" * 80)
     
-    if table_exists:
-        print("📋 Table 'extracted_entities' already exists")
-        response = input("\nDo you want to migrate existing table to add bounding box support? (yes/no): ")
+    try:
+        # Check if table already exists
+        table_exists = check_table_exists(conn)
         
-        if response.lower() == 'yes':
-            if migrate_existing_table():
-                print("\n✅ Migration complete! Table updated with bounding box support")
+        if table_exists:
+            logger.info("📋 Table 'extracted_entities' already exists")
+            response = input("\nDo you want to migrate existing table to add bounding box support? (yes/no): ")
+            
+            if response.lower() == 'yes':
+                if migrate_existing_table(conn):
+                    logger.info("\n✅ Migration complete! Table updated with bounding box support")
+                else:
+                    sys.exit(1)
             else:
-                sys.exit(1)
-        else:
-            print("Skipping migration. Using existing table structure.")
-    else:
-        print("📋 Creating new tables with bounding box support...")
-        if create_tables():
-            print("\n✅ Database setup complete! Ready for Step 2")
+                logger.info("Skipping migration. Using existing table structure.")
         else:
-            sys.exit(1)
+            logger.info("📋 Creating new tables with bounding box support...")
+            if create_tables(conn=conn, exact=args.exact):
+                logger.info("\n✅ Database setup complete! Ready for Step 2")
+            else:
+                sys.exit(1)
+    finally:
+        _putconn(conn)
     
-    print("\n" + "=" * 80)
-    print("🎉 Setup completed successfully!")
+    logger.info("\n" + "=" * 80)
+    logger.info("🎉 Setup completed successfully!")
@@ -0,0 +1,99 @@
+"""asyncpg write path for processing results - for callers already running an event loop"""
+import asyncio
+import asyncpg
+import logging
+from typing import Dict, List, Optional
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from config.config import DB_CONFIG, DocRecord
+from src.database_service import (
+    DatabaseService, ENTITY_COLUMNS, MIN_CONFIDENCE_FROM_ENTITIES_SQL, PROCESSING_INSERT_SQL,
+    _discard_raw_output, _json_text, _offload_raw_output
+)
+
+logger = logging.getLogger(__name__)
+
+# Pool bounds for concurrent ingestion
+MIN_CONNECTIONS = 4
+MAX_CONNECTIONS = 32
+
+
+class AsyncDatabaseService:
+    """Store processing records and entities over asyncpg (binary protocol, COPY for entities)"""
+
+    def __init__(self):
+        self.pool: Optional[asyncpg.Pool] = None
+
+    async def connect(self):
+        """Create the connection pool (call once from the event loop before storing)"""
+        if self.pool is None:
+            self.pool = await asyncpg.create_pool(
+                **DB_CONFIG, min_size=MIN_CONNECTIONS, max_size=MAX_CONNECTIONS
+            )
+            logger.info(f"Created asyncpg pool (max {MAX_CONNECTIONS} connections)")
+
+    async def close(self):
+        """Close the connection pool"""
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    async def store_document_record(
+        self,
+        record: DocRecord,
+        entities: Optional[List[Dict]] = None,
+        raw_processor_output: Optional[Dict] = None
+    ) -> int:
+        """
+        Store a DocRecord and its extracted entities in one transaction
+
+        Same rows as DatabaseService.store_document_record; entities are sent with a
+        binary COPY (copy_records_to_table) instead of a multi-row INSERT.
+
+        Args:
+            record: document_processing row values
+            entities: List of extracted entities (can have multiple entries for same entity_name)
+            raw_processor_output: Complete raw output from Document AI processor
+
+        Returns:
+            processing_id: ID of the created processing record
+        """
+        await self.connect()
+        raw_output_uri = None
+        try:
+            # Large raw outputs are uploaded to GCS off the event loop; the row keeps the URI
+            raw_output_json, raw_output_uri = await asyncio.to_thread(
+                _offload_raw_output, _json_text(raw_processor_output)
+            )
+            
+            async with self.pool.acquire() as conn:
+                async with conn.transaction():
+                    processing_id = await conn.fetchval(
+                        PROCESSING_INSERT_SQL,
+                        record.file_name, record.gcs_path, record.processing_status,
+                        record.document_status, record.min_confidence, record.exception_code,
+                        record.exception_desc, _json_text(record.exception_entities),
+                        record.error_message, raw_output_json, raw_output_uri
+                    )
+
+                    # Insert entities if provided (each value = separate row)
+                    if entities and record.processing_status == 'SUCCESS':
+                        rows = DatabaseService._entity_rows(processing_id, entities)
+                        if rows:
+                            await conn.copy_records_to_table(
+                                'extracted_entities', records=rows, columns=ENTITY_COLUMNS
+                            )
+                            if record.min_confidence is None:
+                                await conn.execute(MIN_CONFIDENCE_FROM_ENTITIES_SQL, processing_id)
+                        logger.info(f"Stored {len(rows)} entity records (including duplicates)")
+
+            logger.info(f"Successfully stored processing record for {record.file_name}")
+            return processing_id
+
+        except Exception as e:
+            await asyncio.to_thread(_discard_raw_output, raw_output_uri)
+            logger.error(f"Failed to store processing record: {str(e)}")
+            raise
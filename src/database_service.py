@@ -1,19 +1,365 @@
 """Database service for storing processing results with bounding boxes - Handles Multiple Values"""
-import psycopg2
-from psycopg2.extras import RealDictCursor, Json
+from psycopg2.extras import RealDictCursor, execute_values
+from contextlib import contextmanager
+import functools
+import io
 import logging
-from datetime import datetime
-from typing import Dict, List, Optional
+import orjson
+from typing import Dict, Iterator, List, Optional
 import os
 import sys
+import uuid
 
 # Add parent directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-from config.config import DB_CONFIG
+from config.config import DB_CONFIG, RAW_OUTPUT_FOLDER, DocRecord
+from src.db_pool import getconn, putconn, get_conn, close_pool, execute_prepared
+from src.gcs_file_manager import GCSFileManager
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# extracted_entities columns in _entity_rows order
+ENTITY_COLUMNS = [
+    'processing_id', 'entity_name', 'entity_value', 'confidence_score', 'page_number',
+    'bounding_box', 'bbox_xmin', 'bbox_ymin', 'bbox_xmax', 'bbox_ymax'
+]
+
+# Multi-row insert for extracted entities; execute_values expands VALUES %s
+ENTITY_INSERT_SQL = """
+    INSERT INTO extracted_entities 
+    (processing_id, entity_name, entity_value, confidence_score, page_number, bounding_box,
+     bbox_xmin, bbox_ymin, bbox_xmax, bbox_ymax)
+    VALUES %s
+"""
+# bounding_box arrives as JSON text (see _json_text) and is parsed server-side
+ENTITY_VALUES_TEMPLATE = "(%s, %s, %s, %s, %s, %s::jsonb, %s, %s, %s, %s)"
+
+# Per-document statements, writes and reads alike, run as server-side prepared statements
+# (see db_pool.execute_prepared; asyncpg prepares PROCESSING_INSERT_SQL for
+# AsyncDatabaseService on its own)
+PROCESSING_INSERT_SQL = """
+    INSERT INTO document_processing 
+    (file_name, gcs_path, processing_status, document_status, min_confidence, 
+     exception_reason_code, exception_reason_description, exception_entities, 
+     error_message, raw_processor_output, raw_processor_output_uri)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
+    RETURNING id
+"""
+# Processing record and its entities in one statement: the entity columns arrive as
+# parallel arrays ($12-$20, in _entity_rows order) and are unnested against the new id.
+# Bounding boxes travel as text[] and are cast per element, since EXECUTE cannot
+# coerce a text[] argument to a jsonb[] parameter. A NULL min_confidence ($5) is
+# derived from the confidence array, so callers need not compute it.
+PROCESSING_WITH_ENTITIES_INSERT_SQL = """
+    WITH p AS (
+        INSERT INTO document_processing 
+        (file_name, gcs_path, processing_status, document_status, min_confidence, 
+         exception_reason_code, exception_reason_description, exception_entities, 
+         error_message, raw_processor_output, raw_processor_output_uri)
+        VALUES ($1, $2, $3, $4, COALESCE($5, (SELECT MIN(c) FROM unnest($14::numeric[]) AS c)),
+                $6, $7, $8, $9, $10, $11)
+        RETURNING id
+    ), e AS (
+        INSERT INTO extracted_entities 
+        (processing_id, entity_name, entity_value, confidence_score, page_number, bounding_box,
+         bbox_xmin, bbox_ymin, bbox_xmax, bbox_ymax)
+        SELECT p.id, t.entity_name, t.entity_value, t.confidence_score, t.page_number,
+               t.bounding_box::jsonb, t.bbox_xmin, t.bbox_ymin, t.bbox_xmax, t.bbox_ymax
+        FROM p
+        CROSS JOIN unnest($12::text[], $13::text[], $14::numeric[], $15::integer[], $16::text[],
+                          $17::float8[], $18::float8[], $19::float8[], $20::float8[])
+            AS t(entity_name, entity_value, confidence_score, page_number, bounding_box,
+                 bbox_xmin, bbox_ymin, bbox_xmax, bbox_ymax)
+    )
+    SELECT id FROM p
+"""
+# Same derivation for entities COPYed after the record insert ($1 = processing id)
+MIN_CONFIDENCE_FROM_ENTITIES_SQL = """
+    UPDATE document_processing
+    SET min_confidence = (SELECT MIN(confidence_score) FROM extracted_entities WHERE processing_id = $1)
+    WHERE id = $1 AND min_confidence IS NULL
+"""
+DOCUMENT_STATUS_UPDATE_SQL = """
+    UPDATE document_processing 
+    SET document_status = $1,
+        exception_reason_code = $2,
+        exception_reason_description = $3,
+        exception_entities = $4,
+        min_confidence = $5,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE id = $6
+"""
+
+# Entity statistics as one json value, split into single- and multi-value entities
+# in SQL; {source} is the entity relation, e.g. "extracted_entities WHERE processing_id = $1"
+ENTITY_STATISTICS_SQL = """
+    SELECT json_build_object(
+        'total_unique_entities', COUNT(*),
+        'entities_with_multiple_values', COALESCE(
+            json_agg(json_build_object('name', entity_name, 'count', value_count, 'values', all_values)
+                     ORDER BY entity_name) FILTER (WHERE value_count > 1),
+            '[]'
+        ),
+        'entities_with_single_value', COALESCE(
+            json_agg(entity_name ORDER BY entity_name) FILTER (WHERE value_count = 1),
+            '[]'
+        ),
+        'entity_details', COALESCE(json_agg(per_entity ORDER BY entity_name), '[]')
+    )
+    FROM (
+        SELECT 
+            entity_name,
+            COUNT(*) as value_count,
+            AVG(confidence_score) as avg_confidence,
+            MAX(confidence_score) as max_confidence,
+            MIN(confidence_score) as min_confidence,
+            ARRAY_AGG(entity_value ORDER BY confidence_score DESC) as all_values
+        FROM {source}
+        GROUP BY entity_name
+    ) per_entity
+"""
+
+# Entity values grouped by entity_name as one json object, best value first in each group
+ENTITIES_GROUPED_SQL = """
+    SELECT COALESCE(json_object_agg(entity_name, entity_values ORDER BY entity_name), json_build_object())
+    FROM (
+        SELECT 
+            entity_name,
+            json_agg(json_build_object(
+                'entity_name', entity_name,
+                'entity_value', entity_value,
+                'confidence_score', confidence_score,
+                'page_number', page_number,
+                'bounding_box', bounding_box
+            ) ORDER BY confidence_score DESC) AS entity_values
+        FROM extracted_entities
+        WHERE processing_id = $1
+        GROUP BY entity_name
+    ) grouped
+"""
+
+# document_processing columns for record reads; the raw output is left out (it can run
+# to megabytes) and loaded on demand by get_raw_processor_output
+PROCESSING_RECORD_COLUMNS = """
+    id, file_name, gcs_path, processing_status, document_status, min_confidence,
+    exception_reason_code, exception_reason_description, exception_entities,
+    created_at, updated_at, error_message, raw_processor_output_uri
+"""
+
+# Processing record plus its entities, per-entity statistics and best values in one
+# round trip; the entity sections come back as json columns next to the record's own.
+# The inline raw output is only read (detoasted) when $2 (include_raw) is true.
+PROCESSING_SUMMARY_SQL = """
+    WITH ents AS (
+        SELECT id, entity_name, entity_value, confidence_score, page_number, bounding_box, created_at
+        FROM extracted_entities
+        WHERE processing_id = $1
+    )
+    SELECT
+        {record_columns},
+        CASE WHEN $2 THEN raw_processor_output END AS raw_processor_output,
+        (raw_processor_output IS NOT NULL OR raw_processor_output_uri IS NOT NULL) AS has_raw_output,
+        (
+            SELECT COALESCE(json_agg(e ORDER BY e.entity_name, e.confidence_score DESC), '[]')
+            FROM ents e
+        ) AS summary_entities,
+        ({statistics}) AS summary_statistics,
+        (
+            SELECT COALESCE(json_object_agg(b.entity_name, b ORDER BY b.entity_name), json_build_object())
+            FROM (
+                SELECT DISTINCT ON (entity_name)
+                    entity_name, entity_value, confidence_score, page_number, bounding_box
+                FROM ents
+                ORDER BY entity_name, confidence_score DESC
+            ) b
+        ) AS summary_best_values
+    FROM document_processing dp
+    WHERE dp.id = $1
+""".format(
+    record_columns=PROCESSING_RECORD_COLUMNS.strip(),
+    statistics=ENTITY_STATISTICS_SQL.format(source="ents")
+)
+
+# Status breakdown, entity total and top entity types for documents created in the
+# last %(days)s days, as one row
+PROCESSING_STATISTICS_SQL = """
+    WITH dp AS (
+        SELECT id, processing_status, created_at, updated_at
+        FROM document_processing
+        WHERE created_at >= NOW() - make_interval(days => %(days)s)
+    )
+    SELECT
+        (
+            SELECT COALESCE(json_agg(s ORDER BY s.processing_status), '[]')
+            FROM (
+                SELECT 
+                    processing_status,
+                    COUNT(*) as count,
+                    AVG(EXTRACT(EPOCH FROM (updated_at - created_at))) as avg_processing_time_seconds
+                FROM dp
+                GROUP BY processing_status
+            ) s
+        ) AS status_breakdown,
+        (
+            SELECT COUNT(*)
+            FROM extracted_entities ee
+            JOIN dp ON ee.processing_id = dp.id
+        ) AS total_entities,
+        (
+            SELECT COALESCE(json_agg(t ORDER BY t.count DESC), '[]')
+            FROM (
+                SELECT 
+                    entity_name,
+                    COUNT(*) as count
+                FROM extracted_entities ee
+                JOIN dp ON ee.processing_id = dp.id
+                GROUP BY entity_name
+                ORDER BY count DESC
+                LIMIT 10
+            ) t
+        ) AS top_entity_types
+"""
+
+# Entities for one processing record, best value first within each entity_name
+ENTITY_SELECT_SQL = """
+    SELECT 
+        id,
+        entity_name, 
+        entity_value, 
+        confidence_score, 
+        page_number, 
+        bounding_box,
+        created_at
+    FROM extracted_entities
+    WHERE processing_id = $1
+    ORDER BY entity_name, confidence_score DESC
+"""
+# iter_extracted_entities' named cursor DECLAREs the query itself (DECLARE cannot wrap an
+# EXECUTE), so that path binds the id client-side
+ENTITY_STREAM_SQL = ENTITY_SELECT_SQL.replace("$1", "%s")
+
+# Entities with their vertices for visualization, in page order
+ENTITY_LOCATION_SQL = """
+    SELECT 
+        entity_name,
+        entity_value,
+        confidence_score,
+        page_number,
+        bounding_box->>'vertices' as vertices,
+        bounding_box->>'normalized_vertices' as normalized_vertices
+    FROM extracted_entities
+    WHERE processing_id = $1
+    ORDER BY page_number, entity_name
+"""
+ENTITY_LOCATION_STREAM_SQL = ENTITY_LOCATION_SQL.replace("$1", "%s")
+
+# Result column names for the tuple cursors in the entity getters, in SELECT order
+ENTITY_SELECT_COLUMNS = (
+    'id', 'entity_name', 'entity_value', 'confidence_score', 'page_number', 'bounding_box', 'created_at'
+)
+ENTITY_VALUE_COLUMNS = ('entity_name', 'entity_value', 'confidence_score', 'page_number', 'bounding_box')
+ENTITY_LOCATION_COLUMNS = (
+    'entity_name', 'entity_value', 'confidence_score', 'page_number', 'vertices', 'normalized_vertices'
+)
+
+# Rows per round trip when streaming entities through a server-side cursor
+ENTITY_FETCH_SIZE = 1000
+
+# Documents with more entity rows than this are streamed with COPY instead of a VALUES list
+ENTITY_COPY_THRESHOLD = 1000
+ENTITY_COPY_SQL = """
+    COPY extracted_entities
+    (processing_id, entity_name, entity_value, confidence_score, page_number, bounding_box,
+     bbox_xmin, bbox_ymin, bbox_xmax, bbox_ymax)
+    FROM STDIN WITH (FORMAT text)
+"""
+
+# bulk_ingest_entities: COPY into the unlogged staging table (no WAL for the load), then
+# move one document's rows into extracted_entities with a single set-based statement.
+# Rows are deleted rather than TRUNCATEd so concurrent loads don't queue on its lock.
+ENTITY_STAGING_COPY_SQL = """
+    COPY extracted_entities_staging
+    (processing_id, entity_name, entity_value, confidence_score, page_number, bounding_box,
+     bbox_xmin, bbox_ymin, bbox_xmax, bbox_ymax)
+    FROM STDIN WITH (FORMAT text)
+"""
+ENTITY_STAGING_MOVE_SQL = """
+    WITH staged AS (
+        DELETE FROM extracted_entities_staging
+        WHERE processing_id = %s
+        RETURNING processing_id, entity_name, entity_value, confidence_score, page_number,
+                  bounding_box, bbox_xmin, bbox_ymin, bbox_xmax, bbox_ymax
+    )
+    INSERT INTO extracted_entities 
+    (processing_id, entity_name, entity_value, confidence_score, page_number, bounding_box,
+     bbox_xmin, bbox_ymin, bbox_xmax, bbox_ymax)
+    SELECT processing_id, entity_name, entity_value, confidence_score, page_number,
+           bounding_box, bbox_xmin, bbox_ymin, bbox_xmax, bbox_ymax
+    FROM staged
+"""
+
+# Backslash escapes for COPY text format (backslash first so the others are not doubled)
+COPY_TEXT_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+# Row value for bbox_* when an entity has no usable normalized vertices
+NO_BBOX_EXTENT = (None, None, None, None)
+
+# Raw outputs whose JSON exceeds this many bytes are uploaded to
+# gs://BUCKET/RAW_OUTPUT_FOLDER/ and only their URI is stored in the row
+RAW_OUTPUT_INLINE_LIMIT = 64 * 1024
+
+
+def _json_text(value) -> Optional[str]:
+    """Serialize a JSON column value once with orjson (None for empty values); Postgres parses the text as jsonb"""
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode() if value else None
+
+
+def _bbox_extent(bounding_box: Optional[Dict]) -> tuple:
+    """(xmin, ymin, xmax, ymax) of the normalized vertices, for the indexed bbox_* columns"""
+    vertices = (bounding_box or {}).get('normalized_vertices') or []
+    xs = [vertex['x'] for vertex in vertices if vertex.get('x') is not None]
+    ys = [vertex['y'] for vertex in vertices if vertex.get('y') is not None]
+    if not xs or not ys:
+        return NO_BBOX_EXTENT
+    return (min(xs), min(ys), max(xs), max(ys))
+
+
+@functools.lru_cache(maxsize=None)
+def _get_gcs_manager() -> GCSFileManager:
+    """GCS manager for offloaded raw outputs, created on first use"""
+    return GCSFileManager()
+
+
+def _offload_raw_output(raw_output_json: Optional[str]) -> tuple:
+    """
+    Decide where a serialized raw output is stored
+    
+    Payloads up to RAW_OUTPUT_INLINE_LIMIT bytes stay in the raw_processor_output
+    column; larger ones are uploaded to GCS under RAW_OUTPUT_FOLDER first.
+    
+    Returns:
+        Tuple of (inline JSON text, GCS URI); at most one of them is set
+    """
+    if raw_output_json is None:
+        return None, None
+    data = raw_output_json.encode()
+    if len(data) <= RAW_OUTPUT_INLINE_LIMIT:
+        return raw_output_json, None
+    uri = _get_gcs_manager().upload_bytes(f"{RAW_OUTPUT_FOLDER}/{uuid.uuid4().hex}.json", data)
+    logger.info(f"Uploaded {len(data)} byte raw output to {uri}")
+    return None, uri
+
+
+def _discard_raw_output(uri: Optional[str]):
+    """Best-effort delete of an uploaded raw output whose row was never written"""
+    if not uri:
+        return
+    try:
+        _get_gcs_manager().blob_for_uri(uri).delete()
+    except Exception as e:
+        logger.warning(f"Failed to delete orphaned raw output {uri}: {str(e)}")
+
 
 class DatabaseService:
     """Handle all database operations - Optimized for multiple entity values"""
@@ -22,14 +368,36 @@ class DatabaseService:
         self.db_config = DB_CONFIG
     
     def get_connection(self):
-        """Create database connection"""
+        """Borrow a connection from the shared pool (hand it back with release_connection)"""
         try:
-            conn = psycopg2.connect(**self.db_config)
-            return conn
+            return getconn()
         except Exception as e:
             logger.error(f"Database connection failed: {str(e)}")
             raise
     
+    def release_connection(self, conn):
+        """Return a connection from get_connection to the pool"""
+        putconn(conn)
+    
+    def close(self):
+        """Close all pooled connections (the pool is recreated on next use)"""
+        close_pool()
+    
+    @contextmanager
+    def _cursor(self, autocommit: bool = False, **cursor_options):
+        """
+        Cursor on a pooled connection for one unit of work
+        
+        Commits when the block succeeds, rolls back if it raises, and returns the
+        connection to the pool either way (see db_pool.get_conn).
+        
+        Args:
+            autocommit: Run each statement in its own transaction
+            **cursor_options: Passed to connection.cursor (cursor_factory, name, ...)
+        """
+        with get_conn(autocommit) as conn, conn.cursor(**cursor_options) as cursor:
+            yield cursor
+    
     def store_processing_record(
         self,
         file_name: str,
@@ -56,7 +424,8 @@ class DatabaseService:
             error_message: Error message if processing failed
             raw_processor_output: Complete raw output from Document AI processor for future analysis
             document_status: Document validation status (SUCCESS, FAILED, PENDING, PENDING_REVIEW)
-            min_confidence: Minimum confidence among all extracted entities
+            min_confidence: Minimum confidence among all extracted entities (derived from the
+                stored entities when omitted)
             exception_reason_code: Exception code for validation failures
             exception_reason_description: Detailed description of validation failures
             exception_entities: JSON object with specific entities that caused exceptions
@@ -64,137 +433,176 @@ class DatabaseService:
         Returns:
             processing_id: ID of the created processing record
         """
-        conn = None
+        record = DocRecord(
+            file_name=file_name,
+            gcs_path=gcs_path,
+            processing_status=processing_status,
+            document_status=document_status,
+            min_confidence=min_confidence,
+            exception_code=exception_reason_code,
+            exception_desc=exception_reason_description,
+            exception_entities=exception_entities,
+            error_message=error_message
+        )
+        return self.store_document_record(record, entities, raw_processor_output)
+    
+    def store_document_record(
+        self,
+        record: DocRecord,
+        entities: Optional[List[Dict]] = None,
+        raw_processor_output: Optional[Dict] = None
+    ) -> int:
+        """
+        Store a DocRecord and its extracted entities in one transaction
+        
+        Args:
+            record: document_processing row values
+            entities: List of extracted entities (can have multiple entries for same entity_name)
+            raw_processor_output: Complete raw output from Document AI processor for future analysis
+            
+        Returns:
+            processing_id: ID of the created processing record
+        """
+        raw_output_uri = None
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            # Insert processing record
-            insert_query = """
-                INSERT INTO document_processing 
-                (file_name, gcs_path, processing_status, document_status, min_confidence, 
-                 exception_reason_code, exception_reason_description, exception_entities, 
-                 error_message, raw_processor_output, updated_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                RETURNING id
-            """
+            # Large raw outputs go to GCS before the row is written; the row keeps the URI
+            raw_output_json, raw_output_uri = _offload_raw_output(_json_text(raw_processor_output))
             
             # Convert JSON objects
-            raw_output_json = Json(raw_processor_output) if raw_processor_output else None
-            exception_entities_json = Json(exception_entities) if exception_entities else None
-            
-            cursor.execute(
-                insert_query,
-                (file_name, gcs_path, processing_status, document_status, min_confidence,
-                 exception_reason_code, exception_reason_description, exception_entities_json,
-                 error_message, raw_output_json, datetime.now())
-            )
-            
-            processing_id = cursor.fetchone()[0]
-            logger.info(f"Created processing record with ID: {processing_id}")
-            
-            # Insert entities if provided (each value = separate row)
-            if entities and processing_status == 'SUCCESS':
-                inserted_count = self._store_entities(cursor, processing_id, entities)
-                logger.info(f"Stored {inserted_count} entity records (including duplicates)")
-            
-            conn.commit()
-            logger.info(f"Successfully stored processing record for {file_name}")
+            exception_entities_json = _json_text(record.exception_entities)
+            
+            # Entity rows (each value = separate row); the id column is filled in by the insert
+            rows = []
+            if entities and record.processing_status == 'SUCCESS':
+                rows = self._entity_rows(None, entities)
+            
+            # Insert processing record and entities in one round trip; documents over
+            # ENTITY_COPY_THRESHOLD rows are COPYed once the id is known. A single
+            # statement is atomic on its own, so it runs in autocommit (no BEGIN/COMMIT
+            # round trips); the insert + COPY pair needs the explicit transaction.
+            inline_rows = rows if len(rows) <= ENTITY_COPY_THRESHOLD else []
+            with self._cursor(autocommit=len(rows) == len(inline_rows)) as cursor:
+                execute_prepared(
+                    cursor,
+                    "ins_processing_entities",
+                    PROCESSING_WITH_ENTITIES_INSERT_SQL,
+                    (record.file_name, record.gcs_path, record.processing_status, record.document_status,
+                     record.min_confidence, record.exception_code, record.exception_desc,
+                     exception_entities_json, record.error_message, raw_output_json, raw_output_uri,
+                     *self._entity_columns(inline_rows))
+                )
+                
+                processing_id = cursor.fetchone()[0]
+                logger.info(f"Created processing record with ID: {processing_id}")
+                
+                if len(rows) > ENTITY_COPY_THRESHOLD:
+                    self._copy_entity_rows(cursor, [(processing_id, *row[1:]) for row in rows])
+                    if record.min_confidence is None:
+                        execute_prepared(cursor, "upd_min_confidence", MIN_CONFIDENCE_FROM_ENTITIES_SQL, (processing_id,))
+            
+            if rows:
+                logger.info(f"Stored {len(rows)} entity records (including duplicates)")
+            logger.info(f"Successfully stored processing record for {record.file_name}")
             return processing_id
             
         except Exception as e:
-            if conn:
-                conn.rollback()
+            _discard_raw_output(raw_output_uri)
             logger.error(f"Failed to store processing record: {str(e)}")
             raise
-        finally:
-            if conn:
-                cursor.close()
-                conn.close()
     
-    def _store_entities(self, cursor, processing_id: int, entities: List[Dict]) -> int:
+    def _store_entities(self, cursor, processing_id: int, rows: List[tuple], page_size: int = 500) -> int:
         """
-        Store extracted entities with bounding boxes
+        Store extracted entities with bounding boxes for an existing processing record
         Each entity value is stored as a SEPARATE ROW
         
         Args:
             cursor: Database cursor
             processing_id: ID of the processing record
-            entities: List of entity dictionaries
+            rows: Validated rows from _entity_rows (built before the transaction opens)
+            page_size: Number of entities per multi-row INSERT statement
             
         Returns:
             Number of rows inserted
         """
-        insert_query = """
-            INSERT INTO extracted_entities 
-            (processing_id, entity_name, entity_value, confidence_score, page_number, bounding_box)
-            VALUES (%s, %s, %s, %s, %s, %s)
+        # All entities for the document go to Postgres in a single statement: one
+        # INSERT page, or COPY once the rows would need several pages (or are many)
+        if len(rows) > min(page_size, ENTITY_COPY_THRESHOLD):
+            self._copy_entity_rows(cursor, rows)
+        elif rows:
+            execute_values(cursor, ENTITY_INSERT_SQL, rows, template=ENTITY_VALUES_TEMPLATE, page_size=page_size)
+        
+        logger.info(f"Stored {len(rows)} entities with bounding boxes for processing_id {processing_id}")
+        return len(rows)
+    
+    @staticmethod
+    def _entity_rows(processing_id: int, entities: List[Dict]) -> List[tuple]:
         """
+        Build extracted_entities rows, skipping invalid or empty entities
         
-        inserted_count = 0
+        Args:
+            processing_id: ID of the processing record
+            entities: List of entity dictionaries
+            
+        Returns:
+            List of row tuples in ENTITY_INSERT_SQL column order
+        """
+        # One pass: entities without a name or with an empty value are dropped.
+        # bounding_box is kept as JSON text for audit; its extent goes into the
+        # numeric bbox_* columns for region queries
+        rows = [
+            (processing_id, entity['name'], value, entity.get('confidence'), entity.get('page_number'),
+             _json_text(bounding_box), *_bbox_extent(bounding_box))
+            for entity in entities
+            if 'name' in entity
+            for value in (str(entity.get('value') or '').strip(),)
+            if value
+            for bounding_box in (entity.get('bounding_box'),)
+        ]
         
-        for entity in entities:
-            try:
-                # Validate entity has required fields
-                if 'name' not in entity or 'value' not in entity:
-                    logger.warning(f"Skipping invalid entity: {entity}")
-                    continue
-                
-                # Skip empty values
-                if not entity['value'] or str(entity['value']).strip() == '':
-                    logger.warning(f"Skipping empty value for entity: {entity.get('name')}")
-                    continue
-                
-                # Convert bounding_box dict to JSON for PostgreSQL
-                bounding_box_json = Json(entity.get('bounding_box')) if entity.get('bounding_box') else None
-                
-                cursor.execute(
-                    insert_query,
-                    (
-                        processing_id,
-                        entity['name'],
-                        str(entity['value']).strip(),
-                        entity.get('confidence'),
-                        entity.get('page_number'),
-                        bounding_box_json
-                    )
-                )
-                inserted_count += 1
-                
-            except Exception as e:
-                logger.error(f"Failed to insert entity {entity.get('name')}: {str(e)}")
-                # Continue with other entities
-                continue
+        skipped = len(entities) - len(rows)
+        if skipped:
+            logger.warning(f"Skipped {skipped} invalid or empty entities")
         
-        logger.info(f"Stored {inserted_count} entities with bounding boxes for processing_id {processing_id}")
-        return inserted_count
+        return rows
+    
+    @staticmethod
+    def _entity_columns(rows: List[tuple]) -> List[list]:
+        """Transpose _entity_rows output into per-column lists (processing_id dropped)"""
+        if not rows:
+            return [[] for _ in range(len(ENTITY_COLUMNS) - 1)]
+        return [list(column) for column in zip(*rows)][1:]
+    
+    def _copy_entity_rows(self, cursor, rows: List[tuple], copy_sql: str = ENTITY_COPY_SQL) -> None:
+        """Stream rows built by _entity_rows into extracted_entities (or copy_sql's table) with COPY"""
+        # Tab-separated lines; \N is NULL and backslashes in values are escaped
+        buf = io.StringIO()
+        for row in rows:
+            buf.write('\t'.join(
+                '\\N' if value is None else str(value).translate(COPY_TEXT_ESCAPES) for value in row
+            ))
+            buf.write('\n')
+        buf.seek(0)
+        cursor.copy_expert(copy_sql, buf)
     
     def get_processing_status(self, file_name: str) -> Optional[Dict]:
         """Get processing status for a file"""
-        conn = None
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            
-            query = """
-                SELECT * FROM document_processing
-                WHERE file_name = %s
-                ORDER BY created_at DESC
-                LIMIT 1
-            """
-            
-            cursor.execute(query, (file_name,))
-            result = cursor.fetchone()
-            
-            return dict(result) if result else None
+            with self._cursor(cursor_factory=RealDictCursor) as cursor:
+                query = f"""
+                    SELECT {PROCESSING_RECORD_COLUMNS} FROM document_processing
+                    WHERE file_name = $1
+                    ORDER BY created_at DESC
+                    LIMIT 1
+                """
+                
+                execute_prepared(cursor, "sel_processing_status", query, (file_name,))
+                result = cursor.fetchone()
+                
+                return dict(result) if result else None
             
         except Exception as e:
             logger.error(f"Failed to get processing status: {str(e)}")
             return None
-        finally:
-            if conn:
-                cursor.close()
-                conn.close()
     
 
     
@@ -203,37 +611,35 @@ class DatabaseService:
         Get extracted entities with bounding boxes for a processing record
         Returns ALL rows (including multiple values for same entity)
         """
-        conn = None
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            
-            query = """
-                SELECT 
-                    id,
-                    entity_name, 
-                    entity_value, 
-                    confidence_score, 
-                    page_number, 
-                    bounding_box,
-                    created_at
-                FROM extracted_entities
-                WHERE processing_id = %s
-                ORDER BY entity_name, confidence_score DESC
-            """
-            
-            cursor.execute(query, (processing_id,))
-            results = cursor.fetchall()
-            
-            return [dict(row) for row in results]
+            with self._cursor() as cursor:
+                execute_prepared(cursor, "sel_entities", ENTITY_SELECT_SQL, (processing_id,))
+                return [dict(zip(ENTITY_SELECT_COLUMNS, row)) for row in cursor.fetchall()]
             
         except Exception as e:
             logger.error(f"Failed to get extracted entities: {str(e)}")
             return []
-        finally:
-            if conn:
-                cursor.close()
-                conn.close()
+    
+    def iter_extracted_entities(self, processing_id: int, itersize: int = ENTITY_FETCH_SIZE) -> Iterator[Dict]:
+        """
+        Stream extracted entities for a processing record (same rows as get_extracted_entities)
+        
+        A named (server-side) cursor fetches itersize rows per round trip, so documents
+        with very many entities never sit in memory as one list. The pooled connection
+        is held until the iterator is exhausted or closed.
+        
+        Args:
+            processing_id: ID of the processing record
+            itersize: Rows fetched per round trip
+            
+        Yields:
+            Entity dictionaries
+        """
+        with self._cursor(name=f"entities_{processing_id}") as cursor:
+            cursor.itersize = itersize
+            cursor.execute(ENTITY_STREAM_SQL, (processing_id,))
+            for row in cursor:
+                yield dict(zip(ENTITY_SELECT_COLUMNS, row))
     
     def get_entities_grouped_by_name(self, processing_id: int) -> Dict[str, List[Dict]]:
         """
@@ -243,100 +649,34 @@ class DatabaseService:
         Returns:
             Dictionary with entity_name as key and list of values as value
         """
-        conn = None
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            
-            query = """
-                SELECT 
-                    entity_name, 
-                    entity_value, 
-                    confidence_score, 
-                    page_number, 
-                    bounding_box
-                FROM extracted_entities
-                WHERE processing_id = %s
-                ORDER BY entity_name, confidence_score DESC
-            """
-            
-            cursor.execute(query, (processing_id,))
-            results = cursor.fetchall()
-            
-            # Group by entity_name
-            grouped = {}
-            for row in results:
-                entity_name = row['entity_name']
-                if entity_name not in grouped:
-                    grouped[entity_name] = []
-                grouped[entity_name].append(dict(row))
-            
-            return grouped
+            with self._cursor() as cursor:
+                # Postgres builds the grouped structure; psycopg2 decodes it to a dict
+                execute_prepared(cursor, "sel_entities_grouped", ENTITIES_GROUPED_SQL, (processing_id,))
+                return cursor.fetchone()[0]
             
         except Exception as e:
             logger.error(f"Failed to get grouped entities: {str(e)}")
             return {}
-        finally:
-            if conn:
-                cursor.close()
-                conn.close()
     
     def get_entity_statistics(self, processing_id: int) -> Dict:
         """
         Get statistics about extracted entities
         Shows which entities have multiple values
         """
-        conn = None
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            
-            query = """
-                SELECT 
-                    entity_name,
-                    COUNT(*) as value_count,
-                    AVG(confidence_score) as avg_confidence,
-                    MAX(confidence_score) as max_confidence,
-                    MIN(confidence_score) as min_confidence,
-                    ARRAY_AGG(entity_value ORDER BY confidence_score DESC) as all_values
-                FROM extracted_entities
-                WHERE processing_id = %s
-                GROUP BY entity_name
-                ORDER BY entity_name
-            """
-            
-            cursor.execute(query, (processing_id,))
-            results = cursor.fetchall()
-            
-            stats = {
-                'total_unique_entities': len(results),
-                'entities_with_multiple_values': [],
-                'entities_with_single_value': [],
-                'entity_details': []
-            }
-            
-            for row in results:
-                entity_info = dict(row)
-                stats['entity_details'].append(entity_info)
-                
-                if row['value_count'] > 1:
-                    stats['entities_with_multiple_values'].append({
-                        'name': row['entity_name'],
-                        'count': row['value_count'],
-                        'values': row['all_values']
-                    })
-                else:
-                    stats['entities_with_single_value'].append(row['entity_name'])
-            
-            return stats
+            with self._cursor() as cursor:
+                execute_prepared(
+                    cursor,
+                    "sel_entity_statistics",
+                    ENTITY_STATISTICS_SQL.format(source="extracted_entities WHERE processing_id = $1"),
+                    (processing_id,)
+                )
+                return cursor.fetchone()[0]
             
         except Exception as e:
             logger.error(f"Failed to get entity statistics: {str(e)}")
             return {}
-        finally:
-            if conn:
-                cursor.close()
-                conn.close()
     
     def get_best_value_per_entity(self, processing_id: int) -> Dict[str, Dict]:
         """
@@ -346,101 +686,94 @@ class DatabaseService:
         Returns:
             Dictionary with entity_name as key and best value info as value
         """
-        conn = None
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            
-            query = """
-                SELECT DISTINCT ON (entity_name)
-                    entity_name,
-                    entity_value,
-                    confidence_score,
-                    page_number,
-                    bounding_box
-                FROM extracted_entities
-                WHERE processing_id = %s
-                ORDER BY entity_name, confidence_score DESC
-            """
-            
-            cursor.execute(query, (processing_id,))
-            results = cursor.fetchall()
-            
-            best_values = {}
-            for row in results:
-                best_values[row['entity_name']] = dict(row)
-            
-            return best_values
+            with self._cursor() as cursor:
+                query = """
+                    SELECT DISTINCT ON (entity_name)
+                        entity_name,
+                        entity_value,
+                        confidence_score,
+                        page_number,
+                        bounding_box
+                    FROM extracted_entities
+                    WHERE processing_id = $1
+                    ORDER BY entity_name, confidence_score DESC
+                """
+                
+                execute_prepared(cursor, "sel_best_values", query, (processing_id,))
+                
+                # entity_name is the first column
+                return {row[0]: dict(zip(ENTITY_VALUE_COLUMNS, row)) for row in cursor.fetchall()}
             
         except Exception as e:
             logger.error(f"Failed to get best values: {str(e)}")
             return {}
-        finally:
-            if conn:
-                cursor.close()
-                conn.close()
     
     def get_entities_with_locations(self, processing_id: int) -> List[Dict]:
         """Get entities with their bounding box locations formatted for visualization"""
-        conn = None
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            
-            query = """
-                SELECT 
-                    entity_name,
-                    entity_value,
-                    confidence_score,
-                    page_number,
-                    bounding_box->>'vertices' as vertices,
-                    bounding_box->>'normalized_vertices' as normalized_vertices
-                FROM extracted_entities
-                WHERE processing_id = %s
-                ORDER BY page_number, entity_name
-            """
-            
-            cursor.execute(query, (processing_id,))
-            results = cursor.fetchall()
-            
-            return [dict(row) for row in results]
+            with self._cursor() as cursor:
+                execute_prepared(cursor, "sel_entity_locations", ENTITY_LOCATION_SQL, (processing_id,))
+                return [dict(zip(ENTITY_LOCATION_COLUMNS, row)) for row in cursor.fetchall()]
             
         except Exception as e:
             logger.error(f"Failed to get entities with locations: {str(e)}")
             return []
-        finally:
-            if conn:
-                cursor.close()
-                conn.close()
+    
+    def iter_entities_with_locations(self, processing_id: int, itersize: int = ENTITY_FETCH_SIZE) -> Iterator[Dict]:
+        """
+        Stream entities with their locations (same rows as get_entities_with_locations)
+        
+        Uses a named (server-side) cursor like iter_extracted_entities; the pooled
+        connection is held until the iterator is exhausted or closed.
+        
+        Args:
+            processing_id: ID of the processing record
+            itersize: Rows fetched per round trip
+            
+        Yields:
+            Entity dictionaries with vertices and normalized_vertices
+        """
+        with self._cursor(name=f"entity_locations_{processing_id}") as cursor:
+            cursor.itersize = itersize
+            cursor.execute(ENTITY_LOCATION_STREAM_SQL, (processing_id,))
+            for row in cursor:
+                yield dict(zip(ENTITY_LOCATION_COLUMNS, row))
     
     def get_raw_processor_output(self, processing_id: int) -> Optional[Dict]:
         """
         Get the raw Document AI processor output for a processing record
         
+        Outputs stored in GCS (raw_processor_output_uri) are downloaded here.
+        
         Args:
             processing_id: ID of the processing record
             
         Returns:
             Raw processor output as dictionary or None if not found
         """
-        conn = None
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            
-            query = """
-                SELECT 
-                    raw_processor_output,
-                    file_name,
-                    processing_status,
-                    created_at
-                FROM document_processing
-                WHERE id = %s
-            """
-            
-            cursor.execute(query, (processing_id,))
-            result = cursor.fetchone()
+            with self._cursor(cursor_factory=RealDictCursor) as cursor:
+                query = """
+                    SELECT 
+                        raw_processor_output,
+                        raw_processor_output_uri,
+                        file_name,
+                        processing_status,
+                        created_at
+                    FROM document_processing
+                    WHERE id = $1
+                """
+                
+                execute_prepared(cursor, "sel_raw_output", query, (processing_id,))
+                result = cursor.fetchone()
             
+            if result and result['raw_processor_output_uri']:
+                result = dict(result)
+                result['raw_processor_output'] = orjson.loads(
+                    _get_gcs_manager().download_bytes(result['raw_processor_output_uri'])
+                )
+                return result
             if result and result['raw_processor_output']:
                 return dict(result)
             return None
@@ -448,10 +781,6 @@ class DatabaseService:
         except Exception as e:
             logger.error(f"Failed to get raw processor output: {str(e)}")
             return None
-        finally:
-            if conn:
-                cursor.close()
-                conn.close()
     
     def update_document_status(
         self, 
@@ -476,137 +805,137 @@ class DatabaseService:
         Returns:
             True if update successful, False otherwise
         """
-        conn = None
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            update_query = """
-                UPDATE document_processing 
-                SET document_status = %s,
-                    exception_reason_code = %s,
-                    exception_reason_description = %s,
-                    exception_entities = %s,
-                    min_confidence = %s,
-                    updated_at = %s
-                WHERE id = %s
-            """
-            
-            exception_entities_json = Json(exception_entities) if exception_entities else None
-            
-            cursor.execute(
-                update_query,
-                (document_status, exception_reason_code, exception_reason_description,
-                 exception_entities_json, min_confidence, datetime.now(), processing_id)
-            )
-            
-            conn.commit()
+            exception_entities_json = _json_text(exception_entities)
+            
+            # Single UPDATE: autocommit skips the BEGIN/COMMIT round trips
+            with self._cursor(autocommit=True) as cursor:
+                execute_prepared(
+                    cursor,
+                    "upd_document_status",
+                    DOCUMENT_STATUS_UPDATE_SQL,
+                    (document_status, exception_reason_code, exception_reason_description,
+                     exception_entities_json, min_confidence, processing_id)
+                )
+            
             logger.info(f"Updated document status to {document_status} for processing_id {processing_id}")
             return True
             
         except Exception as e:
-            if conn:
-                conn.rollback()
             logger.error(f"Failed to update document status: {str(e)}")
             return False
-        finally:
-            if conn:
-                cursor.close()
-                conn.close()
 
-    def get_processing_summary_with_raw(self, processing_id: int) -> Dict:
+    def get_processing_summary_with_raw(self, processing_id: int, include_raw_output: bool = True) -> Dict:
         """
         Get comprehensive processing summary including raw output
         
         Args:
             processing_id: ID of the processing record
+            include_raw_output: Load the raw processor output into the record (from GCS
+                when it was offloaded); pass False to only set has_raw_output
             
         Returns:
             Complete processing summary with raw data
         """
-        conn = None
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            
-            # Get processing record with raw output
-            cursor.execute("""
-                SELECT * FROM document_processing WHERE id = %s
-            """, (processing_id,))
+            with self._cursor(cursor_factory=RealDictCursor) as cursor:
+                # Processing record, entities, statistics and best values in one query
+                execute_prepared(
+                    cursor,
+                    "sel_processing_summary",
+                    PROCESSING_SUMMARY_SQL,
+                    (processing_id, include_raw_output)
+                )
+                
+                row = cursor.fetchone()
             
-            processing_record = cursor.fetchone()
-            if not processing_record:
+            if not row:
                 return {}
             
-            # Get extracted entities
-            entities = self.get_extracted_entities(processing_id)
-            
-            # Get statistics
-            stats = self.get_entity_statistics(processing_id)
+            processing_record = dict(row)
+            entities = processing_record.pop('summary_entities')
+            stats = processing_record.pop('summary_statistics')
+            best_values = processing_record.pop('summary_best_values')
+            has_raw_output = processing_record.pop('has_raw_output')
             
-            # Get best values
-            best_values = self.get_best_value_per_entity(processing_id)
+            if include_raw_output and processing_record['raw_processor_output_uri']:
+                processing_record['raw_processor_output'] = orjson.loads(
+                    _get_gcs_manager().download_bytes(processing_record['raw_processor_output_uri'])
+                )
             
             return {
-                'processing_record': dict(processing_record),
+                'processing_record': processing_record,
                 'total_entities': len(entities),
                 'extracted_entities': entities,
                 'statistics': stats,
                 'best_values': best_values,
-                'has_raw_output': processing_record['raw_processor_output'] is not None
+                'has_raw_output': has_raw_output
             }
             
         except Exception as e:
             logger.error(f"Failed to get processing summary: {str(e)}")
             return {}
-        finally:
-            if conn:
-                cursor.close()
-                conn.close()
     
-    def search_in_raw_output(self, search_term: str, limit: int = 10) -> List[Dict]:
+    def search_in_raw_output(
+        self,
+        search_term: Optional[str] = None,
+        limit: int = 10,
+        contains: Optional[Dict] = None
+    ) -> List[Dict]:
         """
         Search within raw processor output using PostgreSQL JSONB operations
         
+        Only outputs stored inline are searched; those offloaded to GCS are not.
+        
         Args:
-            search_term: Term to search for in raw output
+            search_term: Term to search for in raw output (substring match)
             limit: Maximum number of results to return
+            contains: JSON fragment the raw output must contain (@>), for callers
+                that know the key; cheaper per row than the text match
             
         Returns:
             List of processing records matching the search
+        
+        Raises:
+            ValueError: If neither search_term nor contains is given
         """
-        conn = None
+        # Checked before the try so a bad call is not reported as "no matches"
+        if search_term is None and contains is None:
+            raise ValueError("search_in_raw_output needs search_term or contains")
+        
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            
-            # Use JSONB containment and text search
-            query = """
-                SELECT 
-                    id,
-                    file_name,
-                    processing_status,
-                    created_at,
-                    raw_processor_output
-                FROM document_processing
-                WHERE raw_processor_output IS NOT NULL
-                AND raw_processor_output::text ILIKE %s
-                ORDER BY created_at DESC
-                LIMIT %s
-            """
-            
-            cursor.execute(query, (f'%{search_term}%', limit))
-            results = cursor.fetchall()
-            
-            return [dict(row) for row in results]
+            with self._cursor(cursor_factory=RealDictCursor) as cursor:
+                # Containment when the key is known; the text match uses the trigram
+                # index idx_document_processing_raw_output_trgm (same expression)
+                if contains is not None:
+                    condition = "raw_processor_output @> %s::jsonb"
+                    param = orjson.dumps(contains, option=orjson.OPT_NON_STR_KEYS).decode()
+                else:
+                    condition = "raw_processor_output::text ILIKE %s"
+                    param = f'%{search_term}%'
+                
+                query = f"""
+                    SELECT 
+                        id,
+                        file_name,
+                        processing_status,
+                        created_at,
+                        raw_processor_output
+                    FROM document_processing
+                    WHERE raw_processor_output IS NOT NULL
+                    AND {condition}
+                    ORDER BY created_at DESC
+                    LIMIT %s
+                """
+                
+                cursor.execute(query, (param, limit))
+                results = cursor.fetchall()
+                
+                return [dict(row) for row in results]
             
         except Exception as e:
             logger.error(f"Failed to search raw output: {str(e)}")
             return []
-        finally:
-            if conn:
-                cursor.close()
-                conn.close()
     
     def get_processing_statistics(self, days: int = 30) -> Dict:
         """
@@ -618,64 +947,23 @@ class DatabaseService:
         Returns:
             Statistics dictionary
         """
-        conn = None
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            
-            query = """
-                SELECT 
-                    processing_status,
-                    COUNT(*) as count,
-                    AVG(EXTRACT(EPOCH FROM (updated_at - created_at))) as avg_processing_time_seconds
-                FROM document_processing
-                WHERE created_at >= NOW() - INTERVAL '%s days'
-                GROUP BY processing_status
-                ORDER BY processing_status
-            """
-            
-            cursor.execute(query, (days,))
-            status_stats = cursor.fetchall()
-            
-            # Get total entities processed
-            cursor.execute("""
-                SELECT COUNT(*) as total_entities
-                FROM extracted_entities ee
-                JOIN document_processing dp ON ee.processing_id = dp.id
-                WHERE dp.created_at >= NOW() - INTERVAL '%s days'
-            """, (days,))
-            
-            entity_count = cursor.fetchone()
-            
-            # Get most common entity types
-            cursor.execute("""
-                SELECT 
-                    entity_name,
-                    COUNT(*) as count
-                FROM extracted_entities ee
-                JOIN document_processing dp ON ee.processing_id = dp.id
-                WHERE dp.created_at >= NOW() - INTERVAL '%s days'
-                GROUP BY entity_name
-                ORDER BY count DESC
-                LIMIT 10
-            """, (days,))
-            
-            top_entities = cursor.fetchall()
-            
-            return {
-                'period_days': days,
-                'status_breakdown': [dict(row) for row in status_stats],
-                'total_entities_extracted': entity_count['total_entities'] if entity_count else 0,
-                'top_entity_types': [dict(row) for row in top_entities]
-            }
+            with self._cursor(cursor_factory=RealDictCursor) as cursor:
+                # One round trip; the window is a bound integer (make_interval) rather than
+                # text spliced into an INTERVAL literal
+                cursor.execute(PROCESSING_STATISTICS_SQL, {'days': days})
+                row = cursor.fetchone()
+                
+                return {
+                    'period_days': days,
+                    'status_breakdown': row['status_breakdown'],
+                    'total_entities_extracted': row['total_entities'],
+                    'top_entity_types': row['top_entity_types']
+                }
             
         except Exception as e:
             logger.error(f"Failed to get processing statistics: {str(e)}")
             return {}
-        finally:
-            if conn:
-                cursor.close()
-                conn.close()
     
     def batch_store_entities(self, processing_id: int, entities: List[Dict], batch_size: int = 100) -> int:
         """
@@ -684,81 +972,68 @@ class DatabaseService:
         Args:
             processing_id: ID of the processing record
             entities: List of entity dictionaries
-            batch_size: Number of entities to insert per batch
+            batch_size: Number of entities per multi-row INSERT statement
             
         Returns:
             Total number of entities inserted
         """
-        conn = None
-        total_inserted = 0
-        
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            insert_query = """
-                INSERT INTO extracted_entities 
-                (processing_id, entity_name, entity_value, confidence_score, page_number, bounding_box)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """
-            
-            # Process in batches
-            for i in range(0, len(entities), batch_size):
-                batch = entities[i:i + batch_size]
-                batch_data = []
-                
-                for entity in batch:
-                    # Validate entity
-                    if 'name' not in entity or 'value' not in entity:
-                        logger.warning(f"Skipping invalid entity: {entity}")
-                        continue
-                    
-                    if not entity['value'] or str(entity['value']).strip() == '':
-                        logger.warning(f"Skipping empty value for entity: {entity.get('name')}")
-                        continue
-                    
-                    bounding_box_json = Json(entity.get('bounding_box')) if entity.get('bounding_box') else None
-                    
-                    batch_data.append((
-                        processing_id,
-                        entity['name'],
-                        str(entity['value']).strip(),
-                        entity.get('confidence'),
-                        entity.get('page_number'),
-                        bounding_box_json
-                    ))
-                
-                if batch_data:
-                    cursor.executemany(insert_query, batch_data)
-                    total_inserted += len(batch_data)
-                    
-                    logger.info(f"Inserted batch {i//batch_size + 1}: {len(batch_data)} entities")
+            # Validate and normalize before borrowing a connection, so the transaction
+            # only ships rows; nothing to send means no connection at all
+            rows = self._entity_rows(processing_id, entities)
+            total_inserted = 0
+            if rows:
+                with self._cursor() as cursor:
+                    total_inserted = self._store_entities(cursor, processing_id, rows, page_size=batch_size)
             
-            conn.commit()
             logger.info(f"Batch insert completed: {total_inserted} total entities")
             return total_inserted
             
         except Exception as e:
-            if conn:
-                conn.rollback()
             logger.error(f"Batch insert failed: {str(e)}")
             raise
-        finally:
-            if conn:
-                cursor.close()
-                conn.close()
+
+    def bulk_ingest_entities(self, processing_id: int, entities: List[Dict]) -> int:
+        """
+        Load entities for an existing processing record through the unlogged staging table
+        
+        For bulk paths such as reprocessing: the COPY lands in extracted_entities_staging
+        without WAL, and the rows are moved to extracted_entities in the same transaction,
+        so a failed load leaves nothing behind in either table.
+        
+        Args:
+            processing_id: ID of the processing record
+            entities: List of entity dictionaries
+            
+        Returns:
+            Number of entities inserted
+        """
+        try:
+            # Rows are validated before the transaction opens (see batch_store_entities)
+            rows = self._entity_rows(processing_id, entities)
+            inserted = 0
+            if rows:
+                with self._cursor() as cursor:
+                    self._copy_entity_rows(cursor, rows, ENTITY_STAGING_COPY_SQL)
+                    cursor.execute(ENTITY_STAGING_MOVE_SQL, (processing_id,))
+                    inserted = cursor.rowcount
+            
+            logger.info(f"Bulk ingested {inserted} entities for processing_id {processing_id}")
+            return inserted
+            
+        except Exception as e:
+            logger.error(f"Bulk ingest failed: {str(e)}")
+            raise
 
 
     def test_connection(self) -> bool:
         """Test database connection"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT version();")
-            version = cursor.fetchone()
-            logger.info(f"Database connection test successful: {version[0][:50]}...")
-            cursor.close()
-            conn.close()
+            with get_conn() as conn:
+                # server_version is reported in the startup handshake; no query needed
+                if conn.closed or not conn.server_version:
+                    raise ConnectionError("connection is closed")
+                logger.info(f"Database connection test successful: server version {conn.server_version}")
             return True
         except Exception as e:
             logger.error(f"Database connection test failed: {str(e)}")
@@ -773,34 +1048,28 @@ def test_database_connection():
         conn = db.get_connection()
         cursor = conn.cursor()
         
-        # Test query
-        cursor.execute("SELECT version();")
-        version = cursor.fetchone()
-        print(f"✅ Database connection successful!")
-        print(f"PostgreSQL version: {version[0]}")
-        
-        # Test tables exist
+        # Version, public tables and extracted_entities columns in one round trip
         cursor.execute("""
-            SELECT table_name FROM information_schema.tables
-            WHERE table_schema = 'public'
+            SELECT version(),
+                   (SELECT json_agg(table_name::text ORDER BY table_name)
+                    FROM information_schema.tables
+                    WHERE table_schema = 'public'),
+                   (SELECT json_agg(json_build_array(column_name, data_type) ORDER BY ordinal_position)
+                    FROM information_schema.columns
+                    WHERE table_name = 'extracted_entities')
         """)
-        tables = cursor.fetchall()
-        print(f"\n✅ Tables found: {[t[0] for t in tables]}")
+        version, tables, columns = cursor.fetchone()
+        print(f"✅ Database connection successful!")
+        print(f"PostgreSQL version: {version}")
+        
+        print(f"\n✅ Tables found: {tables or []}")
         
-        # Check extracted_entities columns
-        cursor.execute("""
-            SELECT column_name, data_type 
-            FROM information_schema.columns 
-            WHERE table_name = 'extracted_entities'
-            ORDER BY ordinal_position
-        """)
-        columns = cursor.fetchall()
         print(f"\n✅ extracted_entities columns:")
-        for col in columns:
+        for col in columns or []:
             print(f"   • {col[0]}: {col[1]}")
         
         cursor.close()
-        conn.close()
+        db.release_connection(conn)
         return True
         
     except Exception as e:
@@ -0,0 +1,136 @@
+"""Shared psycopg2 connection pool for the processing job"""
+from contextlib import contextmanager
+from psycopg2.extensions import connection
+from psycopg2.extras import Json, register_default_json, register_default_jsonb
+from psycopg2.pool import ThreadedConnectionPool
+import atexit
+import logging
+import orjson
+import threading
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from config.config import DB_CONFIG, PROCESSING_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+# Each processing worker holds at most one connection; leave headroom for other callers
+MIN_CONNECTIONS = 2
+MAX_CONNECTIONS = PROCESSING_CONCURRENCY + 4
+
+# TCP keepalives so pooled connections survive idle gaps between jobs.
+# Kept out of DB_CONFIG because the API passes DB_CONFIG to asyncpg as well.
+KEEPALIVE_OPTIONS = {
+    'keepalives': 1,
+    'keepalives_idle': 30,
+    'keepalives_interval': 10,
+    'keepalives_count': 3
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Parse jsonb results (raw output, exception entities, bounding boxes) and json
+# aggregates with orjson on every psycopg2 connection in the process
+register_default_json(loads=orjson.loads, globally=True)
+register_default_jsonb(loads=orjson.loads, globally=True)
+
+
+class OrJson(Json):
+    """psycopg2 Json adapter that serializes with orjson (non-str keys become strings, as with json)"""
+    
+    def dumps(self, obj):
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+class PreparingConnection(connection):
+    """Pooled psycopg2 connection that remembers which statements it has PREPAREd"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+
+def execute_prepared(cursor, name: str, statement: str, params: tuple):
+    """
+    Run a statement through a server-side prepared statement
+    
+    The first call on a connection PREPAREs the statement ($1, $2, ... placeholders);
+    later calls only send EXECUTE, so the server skips parse and plan. Prepared
+    statements are session state and survive transaction rollbacks.
+    
+    Args:
+        cursor: Cursor on a pooled connection
+        name: Prepared statement name
+        statement: SQL with $n placeholders
+        params: Values for the placeholders
+    """
+    conn = cursor.connection
+    if name not in conn.prepared:
+        cursor.execute(f"PREPARE {name} AS {statement}")
+        conn.prepared.add(name)
+    cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+
+
+def get_pool() -> ThreadedConnectionPool:
+    """Return the process-wide pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadedConnectionPool(
+                    MIN_CONNECTIONS, MAX_CONNECTIONS, **DB_CONFIG, **KEEPALIVE_OPTIONS,
+                    connection_factory=PreparingConnection
+                )
+                logger.info(f"Created database connection pool (max {MAX_CONNECTIONS} connections)")
+    return _pool
+
+
+def getconn():
+    """Take a connection from the pool; hand it back with putconn()"""
+    return get_pool().getconn()
+
+
+def putconn(conn):
+    """Return a connection to the pool (open transactions are rolled back)"""
+    get_pool().putconn(conn)
+
+
+@contextmanager
+def get_conn(autocommit: bool = False):
+    """
+    Borrow a pooled connection for one unit of work
+
+    Commits when the block succeeds, rolls back if it raises, and always
+    returns the connection to the pool. With autocommit=True each statement
+    commits on its own: for a block that runs a single statement this skips
+    the BEGIN and COMMIT round trips psycopg2 otherwise sends around it.
+    """
+    conn = getconn()
+    conn.autocommit = autocommit
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        # Only reset when set: a block abandoned mid-transaction (e.g. a closed
+        # generator) cannot change autocommit, and putconn rolls it back anyway
+        if autocommit:
+            conn.autocommit = False
+        putconn(conn)
+
+
+def close_pool():
+    """Close every pooled connection (also runs at interpreter exit)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+atexit.register(close_pool)
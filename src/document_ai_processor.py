@@ -1,6 +1,8 @@
 """Document AI processor for entity extraction with bounding boxes"""
 from google.cloud import documentai_v1 as documentai
 from google.cloud import storage
+from collections import defaultdict
+import functools
 import logging
 from typing import Dict, List, Optional
 import os
@@ -9,12 +11,19 @@ from datetime import datetime
 
 # Add parent directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-from config.config import PROJECT_ID, PROCESSOR_ID, LOCATION, REQUIRED_ENTITIES, MIN_CONFIDENCE_THRESHOLD
+from config.config import (PROJECT_ID, PROCESSOR_ID, LOCATION, REQUIRED_ENTITIES, REQUIRED_ENTITIES_SET,
+                           MIN_CONFIDENCE_THRESHOLD)
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 
+@functools.lru_cache(maxsize=None)
+def _get_documentai_client() -> documentai.DocumentProcessorServiceClient:
+    """Build the Document AI client once per process (it holds the gRPC channel)"""
+    return documentai.DocumentProcessorServiceClient()
+
+
 class DocumentAIProcessor:
     """Handle Document AI operations"""
     
@@ -24,8 +33,8 @@ class DocumentAIProcessor:
         self.processor_id = PROCESSOR_ID
         self.processor_name = f"projects/{PROJECT_ID}/locations/us/processors/{PROCESSOR_ID}"
         
-        # Initialize Document AI client
-        self.client = documentai.DocumentProcessorServiceClient()
+        # Shared Document AI client
+        self.client = _get_documentai_client()
         logger.info(f"Initialized Document AI processor: {self.processor_name}")
     
     def process_document_from_gcs(self, gcs_uri: str) -> Optional[documentai.Document]:
@@ -77,37 +86,25 @@ class DocumentAIProcessor:
             Dictionary containing vertices and normalized vertices
         """
         try:
-            if not entity.page_anchor or not entity.page_anchor.page_refs:
+            # An unset page_anchor reads as an empty message, so this covers both checks
+            page_refs = entity.page_anchor.page_refs
+            if not page_refs:
                 return None
             
-            page_ref = entity.page_anchor.page_refs[0]
-            
-            if not page_ref.bounding_poly:
+            bounding_poly = page_refs[0].bounding_poly
+            if not bounding_poly:
                 return None
             
-            bounding_poly = page_ref.bounding_poly
-            
-            # Extract vertices (absolute coordinates)
-            vertices = []
-            if bounding_poly.vertices:
-                for vertex in bounding_poly.vertices:
-                    vertices.append({
-                        'x': float(vertex.x) if hasattr(vertex, 'x') else 0.0,
-                        'y': float(vertex.y) if hasattr(vertex, 'y') else 0.0
-                    })
-            
-            # Extract normalized vertices (0-1 scale)
-            normalized_vertices = []
-            if bounding_poly.normalized_vertices:
-                for vertex in bounding_poly.normalized_vertices:
-                    normalized_vertices.append({
-                        'x': float(vertex.x) if hasattr(vertex, 'x') else 0.0,
-                        'y': float(vertex.y) if hasattr(vertex, 'y') else 0.0
-                    })
-            
+            # Vertex x/y are proto scalars (0 when unset), so no hasattr checks are needed
             return {
-                'vertices': vertices,
-                'normalized_vertices': normalized_vertices
+                # Absolute coordinates
+                'vertices': [
+                    {'x': float(vertex.x), 'y': float(vertex.y)} for vertex in bounding_poly.vertices
+                ],
+                # Normalized coordinates (0-1 scale)
+                'normalized_vertices': [
+                    {'x': float(vertex.x), 'y': float(vertex.y)} for vertex in bounding_poly.normalized_vertices
+                ]
             }
             
         except Exception as e:
@@ -145,6 +142,7 @@ class DocumentAIProcessor:
         try:
             entities_list = []
             entity_dict = {}
+            values_by_name = defaultdict(list)  # entity_name -> values, in document order
             total_confidence = 0
             
             # Convert document to serializable format for storage
@@ -155,28 +153,29 @@ class DocumentAIProcessor:
                 entity_name = entity.type_
                 entity_value = entity.mention_text
                 confidence = entity.confidence
+                rounded_confidence = round(confidence, 2)
                 
                 # Extract bounding box and page number
                 bounding_box = self._extract_bounding_box(entity)
                 page_number = self._get_page_number(entity)
                 
-                entity_data = {
+                entities_list.append({
                     'name': entity_name,
                     'value': entity_value,
-                    'confidence': round(confidence, 2),
+                    'confidence': rounded_confidence,
                     'page_number': page_number,
                     'bounding_box': bounding_box
-                }
-                
-                entities_list.append(entity_data)
+                })
                 
                 entity_dict[entity_name] = {
                     'value': entity_value,
-                    'confidence': round(confidence, 2),
+                    'confidence': rounded_confidence,
                     'page_number': page_number,
                     'bounding_box': bounding_box
                 }
                 
+                # Type counts and multi-value statistics come from this same pass
+                values_by_name[entity_name].append(entity_value)
                 total_confidence += confidence
                 
                 # Log with bounding box info
@@ -186,29 +185,16 @@ class DocumentAIProcessor:
             # Calculate average confidence
             avg_confidence = round(total_confidence / len(entities_list), 2) if entities_list else 0
             
-            # Calculate unique entity types
-            unique_entity_types = len(set(entity['name'] for entity in entities_list))
-            
-            # Calculate statistics for entities with multiple values
-            entity_value_counts = {}
-            for entity in entities_list:
-                entity_name = entity['name']
-                if entity_name not in entity_value_counts:
-                    entity_value_counts[entity_name] = {
-                        'count': 0,
-                        'values': []
-                    }
-                entity_value_counts[entity_name]['count'] += 1
-                entity_value_counts[entity_name]['values'].append(entity['value'])
-            
+            # Unique entity types and entities with multiple values
+            unique_entity_types = len(values_by_name)
             entities_with_multiple_values = [
                 {
                     'name': entity_name,
-                    'count': info['count'],
-                    'values': info['values']
+                    'count': len(values),
+                    'values': values
                 }
-                for entity_name, info in entity_value_counts.items()
-                if info['count'] > 1
+                for entity_name, values in values_by_name.items()
+                if len(values) > 1
             ]
             
             # Validate entities
@@ -249,18 +235,17 @@ class DocumentAIProcessor:
         Returns:
             Validation results with missing and low confidence entities
         """
-        missing_entities = []
-        low_confidence_entities = []
+        # Check for missing required entities: one set difference, reported in
+        # REQUIRED_ENTITIES order (only ordered when something is missing)
+        missing = REQUIRED_ENTITIES_SET.difference(entity_dict)
+        missing_entities = [name for name in REQUIRED_ENTITIES if name in missing] if missing else []
         
-        # Check for missing required entities
-        for required_entity in REQUIRED_ENTITIES:
-            if required_entity not in entity_dict:
-                missing_entities.append(required_entity)
-            elif entity_dict[required_entity]['confidence'] < MIN_CONFIDENCE_THRESHOLD:
-                low_confidence_entities.append({
-                    'name': required_entity,
-                    'confidence': entity_dict[required_entity]['confidence']
-                })
+        low_confidence_entities = [
+            {'name': required_entity, 'confidence': entity_dict[required_entity]['confidence']}
+            for required_entity in REQUIRED_ENTITIES
+            if required_entity not in missing
+            and entity_dict[required_entity]['confidence'] < MIN_CONFIDENCE_THRESHOLD
+        ]
         
         is_valid = len(missing_entities) == 0 and len(low_confidence_entities) == 0
         
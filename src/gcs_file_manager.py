@@ -1,7 +1,12 @@
 """GCS file management for invoice processing"""
 from google.cloud import storage
+from google.api_core.exceptions import NotFound
+import google.auth
+from google.auth.transport.requests import AuthorizedSession
+from requests.adapters import HTTPAdapter
+import functools
 import logging
-from typing import List, Optional
+from typing import Dict, List, Optional
 import os
 import sys
 
@@ -12,6 +17,26 @@ from config.config import BUCKET_NAME, INPUT_FOLDER, PROCESSED_FOLDER, FAILED_FO
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# HTTPS connection pool shared by all GCS calls; sized above the upload fan-out
+# so concurrent uploads keep their TLS connections alive instead of reconnecting
+GCS_POOL_CONNECTIONS = 16
+GCS_POOL_MAXSIZE = 64
+
+# Only the object fields we read; keeps listing responses small
+LIST_FIELDS = "items(name,size,timeCreated,updated,contentType),nextPageToken"
+
+
+@functools.lru_cache(maxsize=None)
+def _get_storage_client() -> storage.Client:
+    """Build the GCS client once per process on a pooled keep-alive session"""
+    credentials, project = google.auth.default(scopes=storage.Client.SCOPE)
+    session = AuthorizedSession(credentials)
+    session.mount("https://", HTTPAdapter(
+        pool_connections=GCS_POOL_CONNECTIONS,
+        pool_maxsize=GCS_POOL_MAXSIZE
+    ))
+    return storage.Client(project=project, credentials=credentials, _http=session)
+
 
 class GCSFileManager:
     """Handle GCS file operations"""
@@ -22,8 +47,8 @@ class GCSFileManager:
         self.processed_folder = PROCESSED_FOLDER
         self.failed_folder = FAILED_FOLDER
         
-        # Initialize GCS client
-        self.client = storage.Client()
+        # Shared GCS client (credentials and connection pool are set up once per process)
+        self.client = _get_storage_client()
         self.bucket = self.client.bucket(self.bucket_name)
         
         logger.info(f"Initialized GCS File Manager for bucket: {self.bucket_name}")
@@ -38,10 +63,22 @@ class GCSFileManager:
         Returns:
             List of file names (without folder prefix)
         """
+        return list(self.list_input_file_info(file_extension))
+    
+    def list_input_file_info(self, file_extension: str = '.pdf') -> Dict[str, dict]:
+        """
+        List the input folder once, returning metadata for every matching file
+        
+        Args:
+            file_extension: Filter by file extension (default: .pdf)
+            
+        Returns:
+            Dictionary of file name -> file info (same shape as get_file_info)
+        """
         try:
-            blobs = self.bucket.list_blobs(prefix=f"{self.input_folder}/")
+            blobs = self.bucket.list_blobs(prefix=f"{self.input_folder}/", fields=LIST_FIELDS)
             
-            files = []
+            files = {}
             for blob in blobs:
                 # Skip the folder itself
                 if blob.name == f"{self.input_folder}/":
@@ -53,14 +90,14 @@ class GCSFileManager:
                 
                 # Extract just the filename
                 file_name = blob.name.split('/')[-1]
-                files.append(file_name)
+                files[file_name] = self._blob_info(file_name, self.input_folder, blob)
             
             logger.info(f"Found {len(files)} {file_extension} files in {self.input_folder}/")
             return files
             
         except Exception as e:
             logger.error(f"Failed to list input files: {str(e)}")
-            return []
+            return {}
     
     def get_gcs_uri(self, file_name: str, folder: Optional[str] = None) -> str:
         """
@@ -94,14 +131,13 @@ class GCSFileManager:
             
             source_blob = self.bucket.blob(source_blob_name)
             
-            # Check if source exists
-            if not source_blob.exists():
+            # Copy to destination (fails with NotFound if the source is missing)
+            try:
+                self.bucket.copy_blob(source_blob, self.bucket, dest_blob_name)
+            except NotFound:
                 logger.error(f"Source file not found: {source_blob_name}")
                 return False
             
-            # Copy to destination
-            self.bucket.copy_blob(source_blob, self.bucket, dest_blob_name)
-            
             # Delete source
             source_blob.delete()
             
@@ -141,6 +177,39 @@ class GCSFileManager:
             logger.error(f"Error checking file existence: {str(e)}")
             return False
     
+    def blob_for_uri(self, gcs_uri: str) -> storage.Blob:
+        """
+        Blob handle for a gs://bucket/path URI on the shared client (no request is made)
+        
+        Args:
+            gcs_uri: Full GCS URI
+            
+        Returns:
+            Blob in the configured bucket, or in the bucket named by the URI
+        """
+        bucket_name, _, blob_name = gcs_uri[len("gs://"):].partition('/')
+        bucket = self.bucket if bucket_name == self.bucket_name else self.client.bucket(bucket_name)
+        return bucket.blob(blob_name)
+    
+    def upload_bytes(self, blob_name: str, data: bytes, content_type: str = 'application/json') -> str:
+        """
+        Upload a payload to the bucket
+        
+        Args:
+            blob_name: Object name including folder (e.g. raw/abc.json)
+            data: Payload bytes
+            content_type: Content type stored with the object
+            
+        Returns:
+            Full GCS URI of the uploaded object
+        """
+        self.bucket.blob(blob_name).upload_from_string(data, content_type=content_type)
+        return f"gs://{self.bucket_name}/{blob_name}"
+    
+    def download_bytes(self, gcs_uri: str) -> bytes:
+        """Download an object by its gs:// URI (raises NotFound if it is missing)"""
+        return self.blob_for_uri(gcs_uri).download_as_bytes()
+    
     def get_file_info(self, file_name: str, folder: Optional[str] = None) -> Optional[dict]:
         """
         Get file metadata
@@ -157,24 +226,30 @@ class GCSFileManager:
             blob_name = f"{folder}/{file_name}"
             blob = self.bucket.blob(blob_name)
             
-            if not blob.exists():
+            # A single metadata request; NotFound means the file does not exist
+            try:
+                blob.reload()
+            except NotFound:
                 return None
             
-            blob.reload()
-            
-            return {
-                'name': file_name,
-                'size': blob.size,
-                'created': blob.time_created,
-                'updated': blob.updated,
-                'content_type': blob.content_type,
-                'gcs_uri': self.get_gcs_uri(file_name, folder)
-            }
+            return self._blob_info(file_name, folder, blob)
             
         except Exception as e:
             logger.error(f"Failed to get file info: {str(e)}")
             return None
 
+    
+    def _blob_info(self, file_name: str, folder: str, blob) -> dict:
+        """Build the file info dictionary from a loaded blob"""
+        return {
+            'name': file_name,
+            'size': blob.size,
+            'created': blob.time_created,
+            'updated': blob.updated,
+            'content_type': blob.content_type,
+            'gcs_uri': self.get_gcs_uri(file_name, folder)
+        }
+
 
 # Test function
 def test_gcs_manager():
@@ -3,16 +3,19 @@ import logging
 from typing import Dict, Optional
 import os
 import sys
-from datetime import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 # Add parent directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from src.document_ai_processor import DocumentAIProcessor
 from src.database_service import DatabaseService
+from src.db_pool import get_conn
 from src.gcs_file_manager import GCSFileManager
-from config.config import (get_exception_details, EXCEPTION_CODES, calculate_min_confidence, 
-                          determine_document_status, MIN_CONFIDENCE_THRESHOLD)
+from config.config import (get_exception_details, EXCEPTION_CODES, 
+                          determine_document_status, MIN_CONFIDENCE_THRESHOLD,
+                          PROCESSING_CONCURRENCY, EntityRec, DocRecord)
 
 logging.basicConfig(
     level=logging.INFO, 
@@ -31,12 +34,13 @@ class InvoiceProcessor:
         
         logger.info("Invoice Processor initialized successfully")
     
-    def process_single_invoice(self, file_name: str) -> Dict:
+    def process_single_invoice(self, file_name: str, file_info: Optional[Dict] = None) -> Dict:
         """
         Process a single invoice file
         
         Args:
             file_name: Name of the file in GCS input folder (just filename, not full path)
+            file_info: File metadata from the input folder listing, if already known
             
         Returns:
             Dictionary with processing results
@@ -44,7 +48,7 @@ class InvoiceProcessor:
         # Clean the filename - remove any path components
         file_name = os.path.basename(file_name)
         
-        start_time = datetime.now()
+        start_time = time.monotonic()
         logger.info(f"{'=' * 80}")
         logger.info(f"Starting processing: {file_name}")
         logger.info(f"{'=' * 80}")
@@ -70,10 +74,11 @@ class InvoiceProcessor:
         try:
             # Step 1: Verify file exists
             logger.info("Step 1: Verifying file exists...")
-            if not self.gcs.file_exists(file_name):
+            if file_info is None:
+                file_info = self.gcs.get_file_info(file_name)
+            if not file_info:
                 raise FileNotFoundError(f"File not found in gs://{self.gcs.bucket_name}/{self.gcs.input_folder}/ - Please check the filename")
             
-            file_info = self.gcs.get_file_info(file_name)
             gcs_uri = file_info['gcs_uri']
             logger.info(f"✅ File found: {gcs_uri}")
             logger.info(f"   Size: {file_info['size']} bytes")
@@ -102,8 +107,21 @@ class InvoiceProcessor:
             validation = extraction_result['validation']
             entities = extraction_result['entities']
             
-            # Calculate minimum confidence
-            min_confidence = calculate_min_confidence(entities)
+            # Single pass over the entities: minimum confidence and every entity
+            # below the threshold (not just required ones)
+            threshold = MIN_CONFIDENCE_THRESHOLD
+            min_confidence = None
+            all_low_confidence_entities = []
+            for entity in entities:
+                entity_confidence = entity.get('confidence')
+                if entity_confidence is None:
+                    entity_confidence = 0
+                elif min_confidence is None or entity_confidence < min_confidence:
+                    min_confidence = entity_confidence
+                if entity_confidence < threshold:
+                    all_low_confidence_entities.append(
+                        EntityRec(entity['name'], entity_confidence, entity.get('value', ''))
+                    )
             result['min_confidence'] = min_confidence
             
             logger.info(f"DEBUG - Validation result: is_valid={validation['is_valid']}")
@@ -115,31 +133,17 @@ class InvoiceProcessor:
             # Get missing entities (required entities not found)
             missing_entities = validation.get('missing', [])
             
-            # Check ALL extracted entities for low confidence (not just required ones)
-            all_low_confidence_entities = []
-            for entity in entities:
-                entity_confidence = entity.get('confidence', 0)
-                if entity_confidence < MIN_CONFIDENCE_THRESHOLD:
-                    all_low_confidence_entities.append({
-                        'name': entity['name'],
-                        'confidence': entity_confidence,
-                        'value': entity.get('value', '')
-                    })
-            
             # Log all low confidence entities found
             if all_low_confidence_entities:
-                logger.info(f"DEBUG - ALL low confidence entities found: {[e['name'] for e in all_low_confidence_entities]}")
+                logger.info(f"DEBUG - ALL low confidence entities found: {[e.name for e in all_low_confidence_entities]}")
             
             # Determine document status based on your requirements:
             # 1. If any required entities are missing -> FAILED
             # 2. If all entities present but ANY entity has low confidence -> PENDING_REVIEW
             # 3. If all entities present and all have good confidence -> SUCCESS
-            if missing_entities:
-                document_status = 'FAILED'
-            elif all_low_confidence_entities:
-                document_status = 'PENDING_REVIEW'
-            else:
-                document_status = 'SUCCESS'
+            document_status = determine_document_status(
+                missing_entities, all_low_confidence_entities, min_confidence
+            )
             
             # Generate exception details with specific entity information
             if missing_entities or all_low_confidence_entities:
@@ -161,8 +165,8 @@ class InvoiceProcessor:
                 if all_low_confidence_entities:
                     logger.warning("   Low confidence entities:")
                     for entity in all_low_confidence_entities:
-                        logger.warning(f"     • {entity['name']}: {entity['confidence']:.2f} (threshold: {MIN_CONFIDENCE_THRESHOLD})")
-                        logger.warning(f"       Value: '{entity['value']}'")
+                        logger.warning(f"     • {entity.name}: {entity.confidence:.2f} (threshold: {MIN_CONFIDENCE_THRESHOLD})")
+                        logger.warning(f"       Value: '{entity.value}'")
             
             # Update result with document validation info
             result['document_status'] = document_status
@@ -178,15 +182,18 @@ class InvoiceProcessor:
             
             # Step 5: Store in database
             logger.info("\nStep 5: Storing in database...")
-            processing_id = self.db.store_processing_record(
+            record = DocRecord(
                 file_name=file_name,
                 gcs_path=gcs_uri,
                 processing_status=result['processing_status'],  # Document AI processing status
-                document_status=result['document_status'],      # Document validation status
-                min_confidence=result['min_confidence'],        # Minimum confidence
-                exception_reason_code=result['exception_reason_code'],
-                exception_reason_description=result['exception_reason_description'],
-                exception_entities=result['exception_entities'], # Detailed entity exception info
+                document_status=document_status,                # Document validation status
+                min_confidence=min_confidence,                  # Minimum confidence
+                exception_code=exception_code,
+                exception_desc=exception_desc,
+                exception_entities=exception_entities           # Detailed entity exception info
+            )
+            processing_id = self.db.store_document_record(
+                record,
                 entities=extraction_result['entities'],
                 raw_processor_output=extraction_result['raw_document_data']
             )
@@ -202,15 +209,11 @@ class InvoiceProcessor:
                 
                 # Update the database record with new GCS path
                 try:
-                    conn = self.db.get_connection()
-                    cursor = conn.cursor()
-                    cursor.execute(
-                        "UPDATE document_processing SET gcs_path = %s WHERE id = %s",
-                        (processed_gcs_uri, processing_id)
-                    )
-                    conn.commit()
-                    cursor.close()
-                    conn.close()
+                    with get_conn(autocommit=True) as conn, conn.cursor() as cursor:
+                        cursor.execute(
+                            "UPDATE document_processing SET gcs_path = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s",
+                            (processed_gcs_uri, processing_id)
+                        )
                     logger.info(f"✅ Updated GCS path to: {processed_gcs_uri}")
                 except Exception as update_error:
                     logger.warning(f"⚠️  Failed to update GCS path: {str(update_error)}")
@@ -296,8 +299,7 @@ class InvoiceProcessor:
         
         finally:
             # Calculate processing time
-            end_time = datetime.now()
-            processing_time = (end_time - start_time).total_seconds()
+            processing_time = time.monotonic() - start_time
             result['processing_time_seconds'] = round(processing_time, 2)
             
             logger.info(f"\n{'=' * 80}")
@@ -313,10 +315,13 @@ class InvoiceProcessor:
         
         return result
     
-    def process_all_invoices(self) -> Dict:
+    def process_all_invoices(self, file_infos: Optional[Dict[str, dict]] = None) -> Dict:
         """
         Process all invoices in the input folder
         
+        Args:
+            file_infos: Input folder listing (list_input_file_info), if already taken
+        
         Returns:
             Summary of processing results
         """
@@ -324,8 +329,10 @@ class InvoiceProcessor:
         logger.info("BATCH PROCESSING: Processing all invoices in input folder")
         logger.info("=" * 80)
         
-        # Get all PDF files
-        files = self.gcs.list_input_files('.pdf')
+        # Get all PDF files with their metadata in one listing
+        if file_infos is None:
+            file_infos = self.gcs.list_input_file_info('.pdf')
+        files = list(file_infos)
         
         if not files:
             logger.info("No PDF files found in input folder")
@@ -338,18 +345,21 @@ class InvoiceProcessor:
         
         logger.info(f"Found {len(files)} PDF files to process\n")
         
-        results = []
-        successful = 0
-        failed = 0
-        
-        for i, file_name in enumerate(files, 1):
+        def process_file(numbered_file):
+            i, file_name = numbered_file
             logger.info(f"\n{'*' * 80}")
             logger.info(f"Processing file {i}/{len(files)}: {file_name}")
             logger.info(f"{'*' * 80}")
-            
-            result = self.process_single_invoice(file_name)
-            results.append(result)
-            
+            return self.process_single_invoice(file_name, file_infos[file_name])
+        
+        # Document AI calls are I/O-bound; overlap them across a bounded pool.
+        # The Document AI, GCS and DB clients are shared and thread-safe.
+        with ThreadPoolExecutor(max_workers=PROCESSING_CONCURRENCY) as pool:
+            results = list(pool.map(process_file, enumerate(files, 1)))
+        
+        successful = 0
+        failed = 0
+        for result in results:
             if result['processing_status'] == 'SUCCESS' and result['document_status'] == 'SUCCESS':
                 successful += 1
             else:
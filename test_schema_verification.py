@@ -22,7 +22,7 @@ def test_database_setup():
 
         if conn:
             print("✅ Database connection successful")
-            conn.close()
+            db.release_connection(conn)
         else:
             print("❌ Database connection failed")
             return False
@@ -161,7 +161,7 @@ def test_new_schema():
                     print(f"      Exception Entities: {record[5]}")
 
             cursor.close()
-            conn.close()
+            db.release_connection(conn)
 
         return True
 
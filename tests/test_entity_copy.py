@@ -0,0 +1,83 @@
+"""Round-trip entity values with COPY text-format special characters through _store_entities"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import psycopg2
+import pytest
+
+from src.database_service import DatabaseService
+from src.db_pool import getconn, putconn
+
+# Values COPY's text format would misread without escaping: the column separator,
+# row terminators, backslash escapes and the NULL marker spelled out as text
+TRICKY_VALUES = [
+    'tab\tseparated',
+    'line one\nline two',
+    'carriage\r\nreturn',
+    'C:\\invoices\\2026\\',
+    '\\N',
+    '\\t is not a tab',
+    'plain value',
+]
+
+
+def test_copy_round_trips_special_characters(monkeypatch):
+    """Values and bounding boxes read back exactly as stored on the COPY path"""
+    copied = []
+    copy_entity_rows = DatabaseService._copy_entity_rows
+    monkeypatch.setattr(
+        DatabaseService, '_copy_entity_rows',
+        lambda self, cursor, rows, *args: copied.append(len(rows)) or copy_entity_rows(self, cursor, rows, *args)
+    )
+
+    try:
+        conn = getconn()
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"database not reachable: {e}")
+
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO document_processing (file_name, gcs_path, processing_status)
+                VALUES ('test_entity_copy.pdf', 'gs://test/test_entity_copy.pdf', 'SUCCESS')
+                RETURNING id
+            """)
+            processing_id = cursor.fetchone()[0]
+
+            entities = [
+                {
+                    'name': f'entity_{i}',
+                    'value': value,
+                    'confidence': 0.9,
+                    'page_number': 0,
+                    'bounding_box': {'label': value, 'normalized_vertices': [{'x': 0.1, 'y': 0.2}]}
+                }
+                for i, value in enumerate(TRICKY_VALUES)
+            ]
+            # Empty values are dropped before COPY; None reaches it in the other columns
+            entities.append({'name': 'entity_null', 'value': 'no extras', 'confidence': None,
+                             'page_number': None, 'bounding_box': None})
+            rows = DatabaseService._entity_rows(processing_id, entities)
+
+            # page_size=1 puts any multi-row batch on the COPY path
+            stored = DatabaseService()._store_entities(cursor, processing_id, rows, page_size=1)
+            assert stored == len(entities)
+            assert copied == [len(entities)]
+
+            cursor.execute("""
+                SELECT entity_value, bounding_box->>'label', bbox_xmin, confidence_score, page_number
+                FROM extracted_entities
+                WHERE processing_id = %s ORDER BY id
+            """, (processing_id,))
+            results = cursor.fetchall()
+
+        *tricky, null_row = results
+        assert [value for value, *_ in tricky] == TRICKY_VALUES
+        assert [label for _, label, *_ in tricky] == TRICKY_VALUES
+        assert all(xmin == 0.1 for _, _, xmin, _, _ in tricky)
+        assert null_row == ('no extras', None, None, None, None)
+    finally:
+        # Nothing is committed: the test rows disappear with the rollback
+        conn.rollback()
+        putconn(conn)
@@ -0,0 +1,50 @@
+"""If-None-Match parsing for the conditional GET endpoints"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import google.auth
+import pytest
+from google.auth.credentials import AnonymousCredentials
+
+ETAG = '"5d41402abc4b2a76b9719d911017c592"'
+
+
+@pytest.fixture(scope="module")
+def etag_matches():
+    """api._etag_matches; api builds its GCP clients at import, so use anonymous credentials"""
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(google.auth, "default", lambda *args, **kwargs: (AnonymousCredentials(), "test-project"))
+        import api
+    return api._etag_matches
+
+
+@pytest.mark.parametrize("if_none_match, expected", [
+    # No header: always serve the body
+    (None, False),
+    ("", False),
+    # Exact strong validator
+    (ETAG, True),
+    (f"  {ETAG}  ", True),
+    # Weak validators match by opaque tag (weak comparison, RFC 9110 13.1.2)
+    (f"W/{ETAG}", True),
+    # Any current representation
+    ("*", True),
+    (" * ", True),
+    # Comma-separated lists, with and without spaces
+    (f'"stale", {ETAG}', True),
+    (f'"stale",W/{ETAG}', True),
+    (f'W/"stale" , {ETAG} ,"other"', True),
+    # Stale or malformed validators must not produce a 304
+    ('"stale"', False),
+    ('W/"stale"', False),
+    ('"stale", "other"', False),
+    (ETAG.strip('"'), False),
+    (ETAG[:-1] + '0"', False),
+    (f'"{ETAG}"', False),
+    (ETAG[:-1], False),
+    (f"{ETAG}x", False),
+])
+def test_etag_matches(etag_matches, if_none_match, expected):
+    """Strong, weak, wildcard and list forms of If-None-Match"""
+    assert etag_matches(if_none_match, ETAG) is expected
@@ -0,0 +1,80 @@
+"""Pin the lookup-table document status / exception classification to the original branches"""
+import itertools
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+
+from config.config import (
+    EXCEPTION_CODES,
+    MIN_CONFIDENCE_THRESHOLD,
+    determine_document_status,
+    get_exception_details,
+)
+
+MISSING = ['invoice_number', 'hsn_number']
+LOW_CONFIDENCE = [{'name': 'vendor_name', 'confidence': 0.42}, 'po_number']
+
+
+def _branch_classification(missing_entities, low_confidence_entities, min_confidence):
+    """The if/elif chains the lookup tables replaced: (status, code, description, reason)"""
+    low_conf_names = [e['name'] if isinstance(e, dict) else e for e in low_confidence_entities]
+    below = min_confidence is not None and min_confidence < MIN_CONFIDENCE_THRESHOLD
+
+    if missing_entities:
+        status = 'FAILED'
+    elif low_confidence_entities or below:
+        status = 'PENDING_REVIEW'
+    else:
+        status = 'SUCCESS'
+
+    if missing_entities and low_confidence_entities:
+        return (status, EXCEPTION_CODES['MIXED_VALIDATION'],
+                f"Missing entities: {missing_entities}; Low confidence entities: {low_conf_names}", None)
+    if missing_entities:
+        return status, EXCEPTION_CODES['MISSING_ENTITIES'], f"Missing required entities: {missing_entities}", None
+    if low_confidence_entities:
+        return (status, EXCEPTION_CODES['LOW_CONFIDENCE'],
+                f"Low confidence entities (< {MIN_CONFIDENCE_THRESHOLD}): {low_conf_names}", None)
+    if below:
+        return (status, EXCEPTION_CODES['LOW_CONFIDENCE'],
+                f"Minimum confidence ({min_confidence:.2f}) below threshold ({MIN_CONFIDENCE_THRESHOLD})",
+                "min_confidence_below_threshold")
+    return status, None, None, None
+
+
+@pytest.mark.parametrize(
+    "missing_entities, low_confidence_entities, min_confidence",
+    list(itertools.product([[], MISSING], [[], LOW_CONFIDENCE], [None, 0.55, 0.93]))
+)
+def test_classification_matches_branches(missing_entities, low_confidence_entities, min_confidence):
+    """Every missing / low confidence / min confidence combination classifies as before"""
+    status, code, desc, reason = _branch_classification(
+        missing_entities, low_confidence_entities, min_confidence
+    )
+
+    assert determine_document_status(missing_entities, low_confidence_entities, min_confidence) == status
+
+    exception_code, exception_desc, exception_entities = get_exception_details(
+        missing_entities, low_confidence_entities, min_confidence
+    )
+    assert (exception_code, exception_desc) == (code, desc)
+    if code is None:
+        assert exception_entities is None
+    else:
+        assert exception_entities.get('reason') == reason
+        assert exception_entities['missing'] == missing_entities
+        low_conf_names = [e['name'] if isinstance(e, dict) else e for e in low_confidence_entities]
+        assert [e['name'] for e in exception_entities['low_confidence']] == low_conf_names
+
+
+def test_min_confidence_just_below_threshold():
+    """A score that rounds up to the threshold still counts as below it"""
+    min_confidence = MIN_CONFIDENCE_THRESHOLD - 0.001
+
+    assert determine_document_status([], [], min_confidence) == 'PENDING_REVIEW'
+    code, desc, exception_entities = get_exception_details([], [], min_confidence)
+    assert code == EXCEPTION_CODES['LOW_CONFIDENCE']
+    assert desc == f"Minimum confidence ({min_confidence:.2f}) below threshold ({MIN_CONFIDENCE_THRESHOLD})"
+    assert exception_entities['min_confidence'] == min_confidence